@@ -1,3 +1,4 @@
+import struct
 from time import time
 
 from blockchain.merkle_tree import get_merkle_root_of_txs
@@ -5,6 +6,15 @@ from blockchain.params import Params
 from blockchain.transaction import Tx
 from utils.hash_utils import sha256d
 from utils.printable import Printable
+from utils.serialize_utils import pack_list, Reader
+
+# 区块头的二进制布局：version | timestamp | prev_hash | bits | merkle_root | nonce
+# nonce位于末尾，挖矿时前缀保持不变，可预先计算哈希中间状态
+HEADER_PREFIX_FORMAT = struct.Struct('<IQ32sI32s')
+NONCE_FORMAT = struct.Struct('<I')
+MAX_NONCE = (1 << (8 * NONCE_FORMAT.size)) - 1
+EMPTY_HASH = bytes(32)
+HEADER_FIELDS = frozenset(('version', 'timestamp', 'prev_hash', 'nonce', 'bits', 'merkle_root'))
 
 
 class Block(Printable):
@@ -13,12 +23,13 @@ class Block(Printable):
     """
 
     def __init__(self, timestamp=None, prev_hash=None, nonce=0,
-                 bits=Params.DIFFICULTY_BITS, txs=None):
+                 bits=Params.DIFFICULTY_BITS, txs=None, merkle_root=None):
         """
         :param timestamp: 时戳
         :param prev_hash: 区块链中前一区块的哈希值
         :param nonce: 工作量证明使用到的随机数
         :param txs: 区块中包含的交易列表
+        :param merkle_root: 梅克尔根，仅在只有区块头（txs为None）时使用
         """
         self.version = 0
         self.timestamp = timestamp or int(time())
@@ -26,7 +37,13 @@ class Block(Printable):
         self.nonce = nonce
         self.bits = bits
         self.txs = txs
-        self.merkle_root = get_merkle_root_of_txs(self.txs) if self.txs else None
+        self.merkle_root = get_merkle_root_of_txs(self.txs) if self.txs else merkle_root
+        self._hash = sha256d(self.header())  # 区块头构造后不再改变，哈希值只计算一次
+
+    def __setattr__(self, key, value):
+        if key in HEADER_FIELDS and '_hash' in self.__dict__:
+            raise AttributeError(f"区块头字段{key}不可修改，请使用replace构造新区块")
+        super().__setattr__(key, value)
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -45,12 +62,24 @@ class Block(Printable):
                 return False
         return False
 
-    def header(self, nonce=None) -> str:
+    def header_prefix(self) -> bytes:
+        """
+        :return: 区块头中除nonce外的固定部分
+        :rtype: bytes
+        """
+        prev_hash = bytes.fromhex(self.prev_hash) if self.prev_hash else EMPTY_HASH
+        merkle_root = bytes.fromhex(self.merkle_root) if self.merkle_root else EMPTY_HASH
+        return HEADER_PREFIX_FORMAT.pack(self.version, int(self.timestamp), prev_hash,
+                                         self.bits, merkle_root)
+
+    def header(self, nonce=None) -> bytes:
         """
+        :param nonce: 替换使用的nonce值
         :return: 区块头
-        :rtype: str
+        :rtype: bytes
         """
-        return f"{self.version}{self.timestamp}{self.prev_hash}{nonce or self.nonce}{self.bits}{self.merkle_root}"
+        nonce = self.nonce if nonce is None else nonce
+        return self.header_prefix() + NONCE_FORMAT.pack(nonce)
 
     @property
     def hash(self) -> str:
@@ -58,7 +87,42 @@ class Block(Printable):
         :return: 区块头的哈希值
         :rtype: str
         """
-        return sha256d(self.header())
+        return self._hash
+
+    @property
+    def size(self) -> int:
+        """
+        :return: 区块编码后的字节数
+        """
+        return len(self.serialize())
+
+    def serialize(self) -> bytes:
+        """
+        :return: 区块头与交易列表的二进制编码
+        """
+        return self.header() + pack_list(self.txs)
+
+    @classmethod
+    def deserialize(cls, reader: Reader):
+        """
+        :param reader: 读取器
+        :return: Block对象
+        """
+        _, timestamp, prev_hash, bits, merkle_root = reader.unpack(HEADER_PREFIX_FORMAT)
+        nonce, = reader.unpack(NONCE_FORMAT)
+        block = Block(timestamp, prev_hash.hex() if prev_hash != EMPTY_HASH else None,
+                      nonce, bits, reader.list(Tx))
+        if (block.merkle_root or EMPTY_HASH.hex()) != merkle_root.hex():
+            raise ValueError("区块梅克尔根不匹配")
+        return block
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        :param data: 区块的二进制编码
+        :return: Block对象
+        """
+        return cls.deserialize(Reader(data))
 
     def replace(self, nonce=None):
         """
@@ -66,7 +130,38 @@ class Block(Printable):
         :param nonce:
         :return: 新区块
         """
-        return Block(self.timestamp, self.prev_hash, nonce or self.nonce, self.bits, self.txs)
+        nonce = self.nonce if nonce is None else nonce
+        return Block(self.timestamp, self.prev_hash, nonce, self.bits, self.txs)
+
+    def replace_timestamp(self, timestamp):
+        """
+        替换区块时戳并将nonce归零，用于nonce空间耗尽后继续搜索
+        :param timestamp: 新的时戳
+        :return: 新区块
+        """
+        return Block(timestamp, self.prev_hash, 0, self.bits, self.txs)
+
+    def header_dict(self) -> dict:
+        """
+        :return: 区块头字段组成的字典，用于同步区块头
+        """
+        return {'version': self.version, 'timestamp': self.timestamp, 'prev_hash': self.prev_hash,
+                'nonce': self.nonce, 'bits': self.bits, 'merkle_root': self.merkle_root, 'hash': self.hash}
+
+    @classmethod
+    def from_header_dict(cls, dic):
+        """
+        从区块头字典构造不含交易的区块
+        :param dic: 区块头字典
+        :return: 只有区块头的Block对象，哈希值与字典中的不符时返回None
+        """
+        if not isinstance(dic, dict) or len(dic) == 0:
+            return None
+        block = Block(dic['timestamp'], dic['prev_hash'], dic['nonce'], dic['bits'],
+                      merkle_root=dic['merkle_root'])
+        if 'hash' in dic and dic['hash'] != block.hash:
+            return None
+        return block
 
     @classmethod
     def from_dict(cls, dic):
@@ -0,0 +1,203 @@
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from blockchain.block import Block
+from blockchain.params import Params
+from utils.serialize_utils import Reader
+
+# 索引记录：类型 | 高度 | 区块哈希 | 文件编号 | 偏移 | 长度
+# b'B' 区块位置：哈希 -> (文件编号, 偏移, 长度)
+# b'H' 高度：高度 -> 哈希
+# b'T' 链长度：主链长度，高度大于等于该值的记录作废
+INDEX_RECORD = struct.Struct('<cI32sIQI')
+RECORD_BLOCK = b'B'
+RECORD_HEIGHT = b'H'
+RECORD_TIP = b'T'
+
+
+class BlockStore:
+    """
+    追加写入的区块存储，区块序列化后追加到分段文件中，索引文件记录哈希到(文件, 偏移, 长度)以及高度到哈希
+    """
+
+    def __init__(self, directory: str, max_file_size: int = Params.BLOCK_FILE_SIZE):
+        """
+        :param directory: 存储目录，首次写入时创建
+        :param max_file_size: 单个分段文件的最大字节数
+        """
+        self.directory = directory
+        self.max_file_size = max_file_size
+        self.locations: Dict[str, Tuple[int, int, int]] = {}
+        self.hashes: List[str] = []  # 主链上各高度的区块哈希
+        self.file_no = 0
+        self.maps: Dict[int, mmap.mmap] = {}
+        self.loaded = False
+
+    @property
+    def index_file(self) -> str:
+        return os.path.join(self.directory, 'index.dat')
+
+    def block_file(self, file_no: int) -> str:
+        return os.path.join(self.directory, f'blk{file_no:05d}.dat')
+
+    def exists(self) -> bool:
+        """
+        :return: 存储是否已存在于磁盘
+        """
+        return os.path.exists(self.index_file)
+
+    def load(self) -> None:
+        """读取索引文件，不读取区块内容"""
+        if self.loaded:
+            return
+        self.loaded = True
+        if not self.exists():
+            return
+        with open(self.index_file, mode='rb') as f:
+            data = f.read()
+        valid = len(data) - len(data) % INDEX_RECORD.size  # 忽略写入中断留下的不完整记录
+        for kind, height, block_hash, file_no, offset, length in INDEX_RECORD.iter_unpack(data[:valid]):
+            block_hash = block_hash.hex()
+            if kind == RECORD_BLOCK:
+                self.locations[block_hash] = (file_no, offset, length)
+                self.file_no = max(self.file_no, file_no)
+            elif kind == RECORD_HEIGHT:
+                del self.hashes[height:]
+                self.hashes.append(block_hash)
+            elif kind == RECORD_TIP:
+                del self.hashes[height:]
+        if valid != len(data):
+            with open(self.index_file, mode='r+b') as f:
+                f.truncate(valid)
+
+    def __len__(self):
+        self.load()
+        return len(self.hashes)
+
+    def has(self, block_hash: str) -> bool:
+        """
+        :param block_hash: 区块哈希
+        :return: 区块是否已存储
+        """
+        self.load()
+        return block_hash in self.locations
+
+    def write_index(self, records) -> None:
+        """
+        :param records: 追加到索引文件的记录
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.index_file, mode='ab') as f:
+            f.write(b''.join(INDEX_RECORD.pack(*record) for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def put(self, blocks) -> None:
+        """
+        将区块追加到分段文件中，已存储的区块会被跳过
+        :param blocks: 区块列表
+        """
+        self.load()
+        blocks = [block for block in blocks if block.hash not in self.locations]
+        if not blocks:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        records = []
+        f = open(self.block_file(self.file_no), mode='ab')
+        try:
+            for block in blocks:
+                data = block.serialize()
+                offset = f.tell()
+                if offset > 0 and offset + len(data) > self.max_file_size:  # 当前分段已满
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    self.file_no += 1
+                    f = open(self.block_file(self.file_no), mode='ab')
+                    offset = 0
+                f.write(data)
+                location = (self.file_no, offset, len(data))
+                self.locations[block.hash] = location
+                records.append((RECORD_BLOCK, 0, bytes.fromhex(block.hash)) + location)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        self.write_index(records)
+
+    def write_chain(self, chain) -> int:
+        """
+        只写入与已存储主链不同的区块，并更新高度索引
+        :param chain: 区块链
+        :return: 新写入主链索引的区块数
+        """
+        self.load()
+        fork = 0  # 第一个与已存储主链不同的高度
+        while fork < min(len(self.hashes), len(chain)) and self.hashes[fork] == chain.hashes[fork]:
+            fork += 1
+        if fork == len(chain) == len(self.hashes):
+            return 0
+        self.put(chain[height] for height in range(fork, len(chain))
+                 if chain.hashes[height] not in self.locations)
+        records = [(RECORD_TIP, fork, bytes(32), 0, 0, 0)]
+        records.extend((RECORD_HEIGHT, height, bytes.fromhex(chain.hashes[height]), 0, 0, 0)
+                       for height in range(fork, len(chain)))
+        self.write_index(records)
+        del self.hashes[fork:]
+        self.hashes.extend(chain.hashes[fork:])
+        return len(chain) - fork
+
+    def get_map(self, file_no: int, end: int) -> mmap.mmap:
+        """
+        :param file_no: 文件编号
+        :param end: 需要访问到的位置
+        :return: 分段文件的内存映射，文件增长后重新映射
+        """
+        mm = self.maps.get(file_no)
+        if mm is None or len(mm) < end:
+            if mm is not None:
+                mm.close()
+            with open(self.block_file(file_no), mode='rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[file_no] = mm
+        return mm
+
+    def get(self, block_hash: str) -> Optional[Block]:
+        """
+        通过内存映射读取区块
+        :param block_hash: 区块哈希
+        :return: 区块，不存在时返回None
+        """
+        self.load()
+        location = self.locations.get(block_hash)
+        if location is None:
+            return None
+        file_no, offset, length = location
+        mm = self.get_map(file_no, offset + length)
+        return Block.deserialize(Reader(mm, offset))
+
+    def get_by_height(self, height: int) -> Optional[Block]:
+        """
+        :param height: 高度
+        :return: 主链上该高度的区块
+        """
+        self.load()
+        if not 0 <= height < len(self.hashes):
+            return None
+        return self.get(self.hashes[height])
+
+    def iter_blocks(self, start: int = 0) -> Iterator[Block]:
+        """
+        :param start: 起始高度
+        :return: 依次读取主链区块的迭代器
+        """
+        for height in range(start, len(self)):
+            yield self.get_by_height(height)
+
+    def close(self) -> None:
+        """关闭所有内存映射"""
+        for mm in self.maps.values():
+            mm.close()
+        self.maps.clear()
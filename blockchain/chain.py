@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional
+
+
+class Chain:
+    """
+    区块链，同时维护区块哈希到高度的索引；从区块存储加载时区块按需读取
+    """
+
+    def __init__(self, blocks=None, store=None):
+        """
+        :param blocks: 初始区块列表
+        :param store: 区块存储，用于按需读取尚未加载的区块
+        """
+        self.blocks: List = []  # 尚未从存储中读取的区块为None
+        self.hashes: List[str] = []
+        self.heights: Dict[str, int] = {}
+        self.store = store
+        for block in blocks or []:
+            self.append(block)
+
+    @classmethod
+    def from_store(cls, store, length: Optional[int] = None):
+        """
+        从区块存储构造区块链，只读取索引，不读取区块内容
+        :param store: 区块存储
+        :param length: 链长度，默认为存储中的主链长度
+        :return: 区块链
+        """
+        store.load()
+        chain = cls(store=store)
+        hashes = store.hashes[:length] if length is not None else list(store.hashes)
+        chain.hashes = hashes
+        chain.blocks = [None] * len(hashes)
+        chain.heights = {block_hash: height for height, block_hash in enumerate(hashes)}
+        return chain
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __iter__(self):
+        for height in range(len(self.blocks)):
+            yield self[height]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[height] for height in range(*item.indices(len(self.blocks)))]
+        block = self.blocks[item]
+        if block is None:
+            block = self.store.get(self.hashes[item])
+            self.blocks[item] = block
+        return block
+
+    def __repr__(self):
+        return repr(list(self))
+
+    @property
+    def tip_hash(self) -> Optional[str]:
+        """
+        :return: 链尾区块的哈希值
+        """
+        return self.hashes[-1] if self.hashes else None
+
+    def append(self, block) -> None:
+        """
+        将区块添加到链尾
+        :param block: 区块
+        """
+        self.heights[block.hash] = len(self.blocks)
+        self.hashes.append(block.hash)
+        self.blocks.append(block)
+
+    def pop(self):
+        """
+        移除链尾区块
+        :return: 被移除的区块
+        """
+        block = self[-1]
+        self.blocks.pop()
+        del self.heights[self.hashes.pop()]
+        return block
+
+    def clear(self) -> None:
+        """清空区块链"""
+        self.blocks.clear()
+        self.hashes.clear()
+        self.heights.clear()
+
+    def height_of(self, block_hash: Optional[str]) -> int:
+        """
+        :param block_hash: 区块哈希值
+        :return: 区块高度，不在链中时返回-1
+        """
+        return self.heights.get(block_hash, -1)
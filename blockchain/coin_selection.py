@@ -0,0 +1,156 @@
+import random
+from typing import Callable, Dict, List, Optional
+
+from blockchain.params import Params
+from blockchain.transaction import UTXO
+
+# 选币策略的参数均为按金额从小到大排列的UTXO列表和需要花费的金额，返回选中的UTXO，无法满足时返回None
+
+
+def select_smallest_first(utxos: List[UTXO], target: int) -> Optional[List[UTXO]]:
+    """
+    从金额最小的UTXO开始选取，输入数量最多
+    :param utxos: 按金额升序排列的UTXO列表
+    :param target: 需要花费的金额
+    :return: 选中的UTXO列表
+    """
+    selected, total = [], 0
+    for utxo in utxos:
+        selected.append(utxo)
+        total += utxo.vout.value
+        if total >= target:
+            return selected
+    return None
+
+
+def select_largest_first(utxos: List[UTXO], target: int) -> Optional[List[UTXO]]:
+    """
+    从金额最大的UTXO开始选取，输入数量最少，但通常需要找零
+    :param utxos: 按金额升序排列的UTXO列表
+    :param target: 需要花费的金额
+    :return: 选中的UTXO列表
+    """
+    return select_smallest_first(utxos[::-1], target)
+
+
+def select_branch_and_bound(utxos: List[UTXO], target: int,
+                            max_tries: int = Params.BNB_MAX_TRIES) -> Optional[List[UTXO]]:
+    """
+    分支定界搜索金额恰好等于target、输入数量最少的组合，无需找零
+    :param utxos: 按金额升序排列的UTXO列表
+    :param target: 需要花费的金额
+    :param max_tries: 最大搜索步数
+    :return: 选中的UTXO列表，不存在精确组合时返回None
+    """
+    values = [utxo.vout.value for utxo in reversed(utxos)]  # 从大到小搜索，先找到的组合输入更少
+    remaining = [0] * (len(values) + 1)  # remaining[i]：第i个及之后UTXO的金额之和
+    for i in range(len(values) - 1, -1, -1):
+        remaining[i] = remaining[i + 1] + values[i]
+    if remaining[0] < target:
+        return None
+
+    best = None
+    selected, total, index = [], 0, 0  # selected为已选UTXO的下标
+    for _ in range(max_tries):
+        if total == target:
+            if best is None or len(selected) < len(best):
+                best = list(selected)
+            backtrack = True
+        elif index == len(values) or total + remaining[index] < target:  # 剩余UTXO不足
+            backtrack = True
+        elif best is not None and len(selected) + 1 >= len(best):  # 不可能得到更少的输入
+            backtrack = True
+        else:
+            if total + values[index] <= target:
+                selected.append(index)
+                total += values[index]
+            index += 1
+            continue
+        if not selected:
+            break
+        last = selected.pop()  # 改为不选最后选中的UTXO
+        total -= values[last]
+        index = last + 1
+        while index < len(values) and values[index] == values[last]:  # 跳过金额相同的等价分支
+            index += 1
+    if best is None:
+        return None
+    n = len(utxos)
+    return [utxos[n - 1 - index] for index in best]
+
+
+def select_knapsack(utxos: List[UTXO], target: int,
+                    iterations: int = Params.KNAPSACK_ITERATIONS) -> Optional[List[UTXO]]:
+    """
+    随机逼近的背包选币：在小于target的UTXO中寻找超出金额最少的组合，并与大于target的最小UTXO比较
+    :param utxos: 按金额升序排列的UTXO列表
+    :param target: 需要花费的金额
+    :param iterations: 随机逼近轮数
+    :return: 选中的UTXO列表
+    """
+    smaller, larger = [], None
+    for utxo in utxos:
+        value = utxo.vout.value
+        if value == target:
+            return [utxo]
+        if value < target:
+            smaller.append(utxo)
+        else:
+            larger = utxo  # 大于target的最小UTXO
+            break
+    total = sum(utxo.vout.value for utxo in smaller)
+    if total == target:
+        return smaller
+    if total < target:
+        return [larger] if larger is not None else None
+
+    smaller.reverse()
+    best, best_total = smaller, total
+    rng = random.Random(target)
+    for _ in range(iterations):
+        picked, picked_total = [], 0
+        for utxo in smaller:
+            if rng.random() < 0.5:
+                picked.append(utxo)
+                picked_total += utxo.vout.value
+                if picked_total >= target:
+                    break
+        if target <= picked_total < best_total or \
+                (picked_total == best_total and len(picked) < len(best)):
+            best, best_total = picked, picked_total
+            if best_total == target:
+                break
+    if larger is not None and larger.vout.value <= best_total:
+        return [larger]
+    return best
+
+
+def select_branch_and_bound_or_knapsack(utxos: List[UTXO], target: int) -> Optional[List[UTXO]]:
+    """
+    优先寻找无需找零的精确组合，不存在时回退到背包选币
+    :param utxos: 按金额升序排列的UTXO列表
+    :param target: 需要花费的金额
+    :return: 选中的UTXO列表
+    """
+    return select_branch_and_bound(utxos, target) or select_knapsack(utxos, target)
+
+
+STRATEGIES: Dict[str, Callable[[List[UTXO], int], Optional[List[UTXO]]]] = {
+    'smallest-first': select_smallest_first,
+    'largest-first': select_largest_first,
+    'knapsack': select_knapsack,
+    'branch-and-bound': select_branch_and_bound_or_knapsack,
+}
+
+
+def select_coins(utxos: List[UTXO], target: int, strategy: str = Params.COIN_SELECTION) -> Optional[List[UTXO]]:
+    """
+    按指定策略选取UTXO
+    :param utxos: 按金额升序排列的UTXO列表
+    :param target: 需要花费的金额
+    :param strategy: 策略名称，见STRATEGIES
+    :return: 选中的UTXO列表，余额不足时返回None
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"未知的选币策略：{strategy}")
+    return STRATEGIES[strategy](utxos, target)
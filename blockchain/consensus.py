@@ -1,4 +1,10 @@
-from utils.hash_utils import sha256d
+import multiprocessing
+from collections import deque
+from hashlib import sha256
+from typing import Optional, Tuple
+
+from blockchain.block import NONCE_FORMAT, MAX_NONCE
+from blockchain.params import Params
 
 
 def calculate_target(bits) -> int:
@@ -9,14 +15,99 @@ def calculate_target(bits) -> int:
     return 1 << (256 - bits)
 
 
-def mine(block) -> int:
+def calculate_target_bytes(bits) -> bytes:
+    """
+    :param bits: 位数
+    :return: 目标值的32字节大端表示，可直接与摘要按字节比较
+    """
+    target = min(calculate_target(bits), (1 << 256) - 1)
+    return target.to_bytes(32, 'big')
+
+
+def search_nonce(midstate, target: bytes, start: int, end: int) -> Optional[int]:
+    """
+    在[start, end)范围内搜索满足难度要求的nonce
+    :param midstate: 区块头固定前缀的哈希中间状态
+    :param target: 目标值的字节表示
+    :param start: 起始nonce
+    :param end: 结束nonce（不包含）
+    :return: nonce值，未找到时返回None
+    """
+    pack = NONCE_FORMAT.pack
+    for nonce in range(start, end):
+        h = midstate.copy()
+        h.update(pack(nonce))
+        if sha256(h.digest()).digest() < target:
+            return nonce
+    return None
+
+
+def mine(block) -> Optional[int]:
     """
     挖矿
     :param block: 最开始的情况
-    :return: nonce值
+    :return: nonce值，nonce空间耗尽时返回None
+    """
+    midstate = sha256(block.header_prefix())  # 区块头固定前缀的哈希中间状态
+    target = calculate_target_bytes(block.bits)
+    return search_nonce(midstate, target, block.nonce, MAX_NONCE + 1)
+
+
+def search_nonce_job(job) -> Optional[int]:
+    """
+    在工作进程中搜索一段nonce区间
+    :param job: (区块头固定前缀, 目标值的字节表示, 起始nonce, 结束nonce)
+    :return: nonce值，未找到时返回None
+    """
+    prefix, target, start, end = job
+    return search_nonce(sha256(prefix), target, start, end)
+
+
+def mine_parallel(block, workers: int, pool, chunk: int = Params.MINING_CHUNK,
+                  cancel=None) -> Tuple[Optional[int], int]:
+    """
+    在常驻进程池中并行挖矿，保持workers段互不重叠的nonce区间在途，按区间顺序取回结果
+    :param block: 最开始的情况
+    :param workers: 同时搜索的区间数
+    :param pool: 启动时创建的进程池，避免在已有多个线程的进程中fork
+    :param chunk: 每段nonce区间的大小
+    :param cancel: 取消信号（threading.Event），被设置后不再等待在途区间
+    :return: nonce值（nonce空间耗尽或被取消时为None）与已搜索的nonce数量
+    """
+    prefix, target = block.header_prefix(), calculate_target_bytes(block.bits)
+    in_flight = deque()  # (异步结果, 起始nonce, 结束nonce)
+    start, tried = block.nonce, 0
+    while True:
+        while len(in_flight) < workers and start <= MAX_NONCE:
+            end = min(start + chunk, MAX_NONCE + 1)
+            in_flight.append((pool.apply_async(search_nonce_job, ((prefix, target, start, end),)), start, end))
+            start = end
+        if not in_flight or (cancel is not None and cancel.is_set()):
+            return None, tried
+        result, begin, end = in_flight[0]
+        try:
+            nonce = result.get(timeout=0.1)
+        except multiprocessing.TimeoutError:
+            continue
+        in_flight.popleft()
+        if nonce is not None:  # 其余在途区间的结果被丢弃
+            return nonce, tried + nonce - begin + 1
+        tried += end - begin
+
+
+def mine_block(block, workers: int = 1, pool=None):
+    """
+    挖矿直到找到合法区块，nonce空间耗尽时递增时戳后重新搜索
+    :param block: 最开始的情况
+    :param workers: 工作进程数，为1时在当前进程中挖矿
+    :param pool: 进程池，workers大于1时使用
+    :return: 找到合法nonce后的区块
     """
-    nonce = block.nonce
-    target = calculate_target(block.bits)
-    while int(sha256d(block.header(nonce)), 16) >= target:
-        nonce += 1
-    return nonce
+    while True:
+        if workers > 1:
+            nonce, _ = mine_parallel(block, workers, pool)
+        else:
+            nonce = mine(block)
+        if nonce is not None:
+            return block.replace(nonce=nonce)
+        block = block.replace_timestamp(block.timestamp + 1)
@@ -0,0 +1,332 @@
+import heapq
+from collections import deque
+from itertools import count
+from time import time
+from typing import Dict, List, Optional, Set
+
+from blockchain.params import Params
+from blockchain.transaction import Pointer, Tx
+
+
+class MemPool(dict):
+    """
+    交易池，交易编号到交易的映射，同时维护被花费的UTXO定位指针到交易编号的索引，
+    交易池内的父子交易关系、按祖先交易费率排序的打包队列和按后代交易费率排序的淘汰队列，
+    并限制总字节数和存活时间
+    """
+
+    def __init__(self, txs=None, max_bytes: int = Params.MAX_MEMPOOL_SIZE, expiry: int = Params.MEMPOOL_EXPIRY,
+                 max_ancestors: int = Params.MAX_ANCESTORS, max_descendants: int = Params.MAX_DESCENDANTS):
+        """
+        :param txs: 初始交易，交易编号到交易的映射
+        :param max_bytes: 交易池中交易的最大总字节数
+        :param expiry: 交易的存活时间，单位：秒
+        :param max_ancestors: 交易与其交易池内祖先交易的最大数量
+        :param max_descendants: 交易与其交易池内后代交易的最大数量
+        """
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.expiry = expiry
+        self.max_ancestors = max_ancestors
+        self.max_descendants = max_descendants
+        self.total_size = 0  # 交易池中交易的总字节数
+        self.added_at: Dict[str, float] = {}
+        self.arrivals = deque()  # (加入时间, 交易编号)，按加入时间排序，时间与added_at不符的条目已失效
+        self.spent: Dict[Pointer, str] = {}
+        self.parents: Dict[str, Set[str]] = {}  # 交易池内被该交易花费输出的交易
+        self.children: Dict[str, Set[str]] = {}  # 交易池内花费该交易输出的交易
+        self.ancestor_fee: Dict[str, int] = {}  # 交易与其交易池内全部祖先的交易费之和
+        self.ancestor_size: Dict[str, int] = {}  # 交易与其交易池内全部祖先的字节数之和
+        self.ancestor_count: Dict[str, int] = {}  # 交易与其交易池内全部祖先的数量
+        self.sequence: Dict[str, int] = {}  # 加入顺序，费率相同时先加入的交易优先
+        self.heap = []  # (-祖先交易费率, 加入顺序, 交易编号, 版本)，版本过期的条目在出队时丢弃
+        self.versions: Dict[str, int] = {}
+        self.descendant_fee: Dict[str, int] = {}  # 交易与其交易池内全部后代的交易费之和
+        self.descendant_size: Dict[str, int] = {}  # 交易与其交易池内全部后代的字节数之和
+        self.descendant_count: Dict[str, int] = {}  # 交易与其交易池内全部后代的数量
+        self.evict_heap = []  # (后代交易费率, -加入顺序, 交易编号, 版本)，费率最低、最晚加入的先被淘汰
+        self.evict_versions: Dict[str, int] = {}
+        self.counter = count()
+        if txs:
+            self.update(txs)
+
+    def __setitem__(self, tx_id: str, tx: Tx):
+        if tx_id in self:
+            del self[tx_id]
+        super().__setitem__(tx_id, tx)
+        self.total_size += tx.size
+        self.added_at[tx_id] = added_at = time()
+        self.arrivals.append((added_at, tx_id))
+        if len(self.arrivals) > 2 * len(self) + 64:  # 失效条目过多时压缩
+            self.arrivals = deque(entry for entry in self.arrivals if self.added_at.get(entry[1]) == entry[0])
+        self.sequence[tx_id] = next(self.counter)
+        parents = {vin.to_spend.tx_id for vin in tx.tx_in
+                   if vin.to_spend is not None and vin.to_spend.tx_id in self}
+        self.parents[tx_id] = parents
+        self.children[tx_id] = set()
+        for parent in parents:
+            self.children[parent].add(tx_id)
+        for vin in tx.tx_in:
+            if vin.to_spend is not None:
+                self.spent[vin.to_spend] = tx_id
+        # 交易池中已有花费该交易输出的交易（如回滚后交易重新进入交易池）
+        for n in range(len(tx.tx_out)):
+            child = self.spent.get(Pointer(tx_id, n))
+            if child is not None and child != tx_id:
+                self.parents[child].add(tx_id)
+                self.children[tx_id].add(child)
+        ancestors, descendants = self.ancestors_of(tx_id), self.descendants_of(tx_id)
+        self._set_ancestor_stats(tx_id, tx.fee + sum(self[member].fee for member in ancestors),
+                                 tx.size + sum(self[member].size for member in ancestors), len(ancestors) + 1)
+        self._set_descendant_stats(tx_id, tx.fee + sum(self[member].fee for member in descendants),
+                                   tx.size + sum(self[member].size for member in descendants), len(descendants) + 1)
+        if not descendants:  # 新交易只是各祖先交易的一个新后代
+            for ancestor in ancestors:
+                self._add_descendant_stats(ancestor, tx.fee, tx.size, 1)
+        else:  # 交易重新进入交易池且已有后代交易，后代交易可能通过多条路径与祖先相连，重新计算
+            for member in ancestors | descendants:
+                self._recompute_stats(member)
+
+    def __delitem__(self, tx_id: str):
+        tx = self[tx_id]
+        ancestors, descendants = self.ancestors_of(tx_id), self.descendants_of(tx_id)
+        super().__delitem__(tx_id)
+        self.total_size -= tx.size
+        self._unindex(tx)
+        if not descendants:
+            for ancestor in ancestors:
+                self._add_descendant_stats(ancestor, -tx.fee, -tx.size, -1)
+        elif not ancestors:
+            for descendant in descendants:
+                self._add_ancestor_stats(descendant, -tx.fee, -tx.size, -1)
+        else:  # 移除中间的交易，部分后代交易不再是其祖先交易的后代，重新计算
+            for member in ancestors | descendants:
+                self._recompute_stats(member)
+
+    def _unindex(self, tx: Tx):
+        tx_id = tx.id
+        for vin in tx.tx_in:
+            if self.spent.get(vin.to_spend) == tx_id:
+                del self.spent[vin.to_spend]
+        for parent in self.parents.pop(tx_id, ()):
+            self.children[parent].discard(tx_id)
+        for child in self.children.pop(tx_id, ()):
+            self.parents[child].discard(tx_id)
+        for index in (self.ancestor_fee, self.ancestor_size, self.ancestor_count, self.sequence, self.versions,
+                      self.added_at, self.descendant_fee, self.descendant_size, self.descendant_count,
+                      self.evict_versions):
+            index.pop(tx_id, None)
+
+    def _set_ancestor_stats(self, tx_id: str, fee: int, size: int, count: int):
+        """
+        设置交易的祖先交易费、字节数与数量，并以新的费率加入打包队列
+        :param tx_id: 交易编号
+        :param fee: 交易与其祖先的交易费之和
+        :param size: 交易与其祖先的字节数之和
+        :param count: 交易与其祖先的数量
+        """
+        self.ancestor_fee[tx_id], self.ancestor_size[tx_id], self.ancestor_count[tx_id] = fee, size, count
+        version = self.versions.get(tx_id, 0) + 1
+        self.versions[tx_id] = version
+        heapq.heappush(self.heap, (-fee / size, self.sequence[tx_id], tx_id, version))
+        if len(self.heap) > 2 * len(self) + 64:  # 过期条目过多时压缩
+            self.heap = [entry for entry in self.heap if self.versions.get(entry[2]) == entry[3]]
+            heapq.heapify(self.heap)
+
+    def _set_descendant_stats(self, tx_id: str, fee: int, size: int, count: int):
+        """
+        设置交易的后代交易费、字节数与数量，并以新的费率加入淘汰队列
+        :param tx_id: 交易编号
+        :param fee: 交易与其后代的交易费之和
+        :param size: 交易与其后代的字节数之和
+        :param count: 交易与其后代的数量
+        """
+        self.descendant_fee[tx_id], self.descendant_size[tx_id], self.descendant_count[tx_id] = fee, size, count
+        version = self.evict_versions.get(tx_id, 0) + 1
+        self.evict_versions[tx_id] = version
+        heapq.heappush(self.evict_heap, (fee / size, -self.sequence[tx_id], tx_id, version))
+        if len(self.evict_heap) > 2 * len(self) + 64:  # 过期条目过多时压缩
+            self.evict_heap = [entry for entry in self.evict_heap
+                               if self.evict_versions.get(entry[2]) == entry[3]]
+            heapq.heapify(self.evict_heap)
+
+    def _add_ancestor_stats(self, tx_id: str, fee: int, size: int, count: int):
+        self._set_ancestor_stats(tx_id, self.ancestor_fee[tx_id] + fee, self.ancestor_size[tx_id] + size,
+                                 self.ancestor_count[tx_id] + count)
+
+    def _add_descendant_stats(self, tx_id: str, fee: int, size: int, count: int):
+        self._set_descendant_stats(tx_id, self.descendant_fee[tx_id] + fee, self.descendant_size[tx_id] + size,
+                                   self.descendant_count[tx_id] + count)
+
+    def _recompute_stats(self, tx_id: str):
+        """
+        遍历交易池内的祖先与后代交易，重新计算交易的祖先与后代统计
+        :param tx_id: 交易编号
+        """
+        for package, setter in ((self.ancestors_of(tx_id) | {tx_id}, self._set_ancestor_stats),
+                                (self.descendants_of(tx_id) | {tx_id}, self._set_descendant_stats)):
+            setter(tx_id, sum(self[member].fee for member in package),
+                   sum(self[member].size for member in package), len(package))
+
+    def pop(self, tx_id: str, *default):
+        if tx_id not in self:
+            return super().pop(tx_id, *default)
+        tx = self[tx_id]
+        del self[tx_id]
+        return tx
+
+    def popitem(self):
+        tx_id = next(reversed(self))
+        return tx_id, self.pop(tx_id)
+
+    def setdefault(self, tx_id: str, tx: Tx = None):
+        if tx_id not in self:
+            self[tx_id] = tx
+        return self[tx_id]
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, dict):
+            other = other.items()
+        for tx_id, tx in other:
+            self[tx_id] = tx
+        for tx_id, tx in kwargs.items():
+            self[tx_id] = tx
+
+    def clear(self):
+        super().clear()
+        for index in (self.spent, self.parents, self.children, self.ancestor_fee, self.ancestor_size,
+                      self.ancestor_count, self.sequence, self.versions, self.added_at, self.descendant_fee,
+                      self.descendant_size, self.descendant_count, self.evict_versions):
+            index.clear()
+        self.heap = []
+        self.evict_heap = []
+        self.arrivals.clear()
+        self.total_size = 0
+
+    def add(self, tx: Tx) -> None:
+        """
+        :param tx: 加入交易池的交易
+        """
+        self[tx.id] = tx
+
+    def spender_of(self, pointer: Pointer) -> Optional[str]:
+        """
+        :param pointer: UTXO定位指针
+        :return: 交易池中花费该UTXO的交易编号
+        """
+        return self.spent.get(pointer)
+
+    def conflicts(self, tx: Tx) -> Set[str]:
+        """
+        :param tx: 交易
+        :return: 交易池中与该交易花费相同UTXO的交易编号集合
+        """
+        return {self.spent[vin.to_spend] for vin in tx.tx_in if vin.to_spend in self.spent}
+
+    def exceeds_limits(self, tx: Tx) -> bool:
+        """
+        :param tx: 准备加入交易池的交易
+        :return: 加入后交易的祖先数量或其某个祖先的后代数量是否超出上限
+        """
+        ancestors = set()
+        for vin in tx.tx_in:
+            parent = vin.to_spend.tx_id if vin.to_spend is not None else None
+            if parent in self and parent not in ancestors:
+                ancestors.add(parent)
+                ancestors |= self.ancestors_of(parent)
+        if len(ancestors) + 1 > self.max_ancestors:
+            return True
+        return any(self.descendant_count[ancestor] + 1 > self.max_descendants for ancestor in ancestors)
+
+    def ancestors_of(self, tx_id: str) -> Set[str]:
+        """
+        :param tx_id: 交易编号
+        :return: 交易池内的全部祖先交易编号
+        """
+        return self._closure(tx_id, self.parents)
+
+    def descendants_of(self, tx_id: str) -> Set[str]:
+        """
+        :param tx_id: 交易编号
+        :return: 交易池内的全部后代交易编号
+        """
+        return self._closure(tx_id, self.children)
+
+    @staticmethod
+    def _closure(tx_id: str, edges: Dict[str, Set[str]]) -> Set[str]:
+        result, stack = set(), list(edges.get(tx_id, ()))
+        while stack:
+            other = stack.pop()
+            if other not in result:
+                result.add(other)
+                stack.extend(edges.get(other, ()))
+        return result
+
+    def select_txs(self, max_size: int) -> List[Tx]:
+        """
+        按祖先交易费率从高到低选取交易包（交易及其未被选中的祖先），总字节数不超过上限
+        :param max_size: 可用的字节数
+        :return: 交易列表，父交易总在子交易之前
+        """
+        heap = list(self.heap)  # 本身已是堆，无需重新排序
+        selected: Set[str] = set()
+        txs, size = [], 0
+        while heap and size < max_size:
+            entry = heapq.heappop(heap)
+            tx_id, version = entry[2], entry[3]
+            if self.versions.get(tx_id) != version or tx_id in selected:
+                continue
+            package = (self.ancestors_of(tx_id) | {tx_id}) - selected
+            package_fee = sum(self[member].fee for member in package)
+            package_size = sum(self[member].size for member in package)
+            expected = entry[4] if len(entry) > 4 else self.ancestor_size[tx_id]
+            if package_size != expected:  # 部分祖先已被选中，按剩余交易包的费率重新排队
+                heapq.heappush(heap, (-package_fee / package_size, self.sequence[tx_id], tx_id, version, package_size))
+                continue
+            if size + package_size > max_size:
+                continue
+            # 祖先数少的在前，父交易的祖先数总是少于子交易
+            for member in sorted(package, key=lambda member: (self.ancestor_count[member], self.sequence[member])):
+                txs.append(self[member])
+            selected |= package
+            size += package_size
+        return txs
+
+    def remove_with_descendants(self, tx_id: str) -> List[Tx]:
+        """
+        移除交易及其全部后代交易
+        :param tx_id: 交易编号
+        :return: 被移除的交易，后代交易在前
+        """
+        package = self.descendants_of(tx_id) | {tx_id}
+        removed = [self[member] for member in sorted(package, key=lambda member: -self.ancestor_count[member])]
+        for tx in removed:
+            del self[tx.id]
+        return removed
+
+    def trim(self) -> List[Tx]:
+        """
+        总字节数超出上限时，按后代交易费率从低到高淘汰交易及其后代交易
+        :return: 被淘汰的交易，后代交易在前
+        """
+        evicted = []
+        while self.total_size > self.max_bytes and self.evict_heap:
+            _, _, tx_id, version = heapq.heappop(self.evict_heap)
+            if self.evict_versions.get(tx_id) != version:
+                continue
+            evicted.extend(self.remove_with_descendants(tx_id))
+        return evicted
+
+    def expire(self, now: Optional[float] = None) -> List[Tx]:
+        """
+        从最早加入的交易开始移除超过存活时间的交易及其后代交易，遇到未过期的交易即停止
+        :param now: 当前时间
+        :return: 被移除的交易，后代交易在前
+        """
+        limit = (now or time()) - self.expiry
+        expired = []
+        while self.arrivals and self.arrivals[0][0] < limit:
+            added_at, tx_id = self.arrivals.popleft()
+            if self.added_at.get(tx_id) == added_at:  # 可能已被打包、作为后代交易移除或重新加入
+                expired.extend(self.remove_with_descendants(tx_id))
+        return expired
@@ -1,8 +1,11 @@
+from hashlib import sha256
 from typing import Optional, List
 
 from utils.hash_utils import sha256d
 from utils.printable import Printable
 
+HASH_SIZE = 32  # 非叶节点哈希值的字节数
+
 
 def get_merkle_root_of_txs(txs) -> str:
     """
@@ -13,106 +16,112 @@ def get_merkle_root_of_txs(txs) -> str:
     return get_merkle_root([tx.id for tx in txs])
 
 
-def get_merkle_root(level) -> str:
+def get_merkle_root(level) -> Optional[str]:
     """
     从一层节点中求梅尔克树根哈希值
     :param level: 叶节点
-    :return: 哈希值
+    :return: 哈希值，没有叶节点时返回None
     """
-    while len(level) != 1:
-        odd = None
-        if len(level) % 2 == 1:
-            odd = level.pop()
+    return MerkleTree(level).get_root()
 
-        level = [sha256d(i1 + i2) for i1, i2 in pair_node(level)]
 
-        if odd:
-            level.append(odd)
-    return level[0]
+def hash_pair(left: str, right: str) -> bytes:
+    """
+    :param left: 左节点哈希值
+    :param right: 右节点哈希值
+    :return: 父节点哈希值，即sha256d(left + right)的字节形式
+    """
+    return sha256(sha256((left + right).encode()).digest()).digest()
 
 
-def pair_node(level):
+def verify_path(path) -> bool:
     """
-    将一层节点两两配对
-    :param level: 一层节点
-    :return: 配对后的列表
+    按get_path返回的路径由底层节点重新计算根哈希值
+    :param path: 路径
+    :return: 计算结果是否与路径中的根哈希值一致
     """
-    return (level[i:i + 2] for i in range(0, len(level), 2))
-
-
-class Node(Printable):
-    """梅克尔树节点"""
-
-    def __init__(self, data, pre_hashed=False):
-        if pre_hashed:  # 如果是底层节点，哈希值为输入值
-            self.val = data
-        else:
-            self.val = sha256d(data)
-
-        self.left_child = None
-        self.right_child = None
-        self.parent = None
-        self.bro = None
-        self.side = None
-
-
-def build_new_level(leaves):
-    """构建新的层级"""
-    new, odd = [], None
-    if len(leaves) % 2 == 1:
-        odd = leaves.pop(-1)
-    for i in range(0, len(leaves), 2):
-        newnode = Node(leaves[i].val + leaves[i + 1].val)
-        newnode.lelf_child, newnode.right_child = leaves[i], leaves[i + 1]
-        leaves[i].side, leaves[i + 1].side, = 'LEFT', 'RIGHT'
-        leaves[i].parent, leaves[i + 1].parent = newnode, newnode
-        leaves[i].bro, leaves[i + 1].bro = leaves[i + 1], leaves[i]
-        new.append(newnode)
-    if odd:
-        new.append(odd)
-    return new
+    value = path[0][0]
+    for sibling, side in path[1:-1]:
+        value = sha256d(sibling + value) if side == 'LEFT' else sha256d(value + sibling)
+    return value == path[-1][0]
 
 
 class MerkleTree(Printable):
-    """梅克尔树"""
+    """
+    梅克尔树，非叶节点逐层保存在连续的字节数组中，奇数层的最后一个节点直接提升到上一层，提升的节点不重复保存
+    """
 
     def __init__(self, leaves=None):
         """
         :param leaves: 底层节点的哈希值列表
         """
-        if leaves is None:
-            leaves = []
-        self.root = None
-        self.leaves = []
-        self.set_leaves(leaves)
+        self.leaves: List[str] = []
+        self.levels: List[bytearray] = []  # 第k项为第k+1层中由两个子节点计算出的哈希值
+        self.set_leaves(leaves or [])
+
+    def __len__(self):
+        return len(self.leaves)
 
     def set_leaves(self, leaves):
-        self.leaves = [Node(leaf, True) for leaf in leaves]
-        self.root = None
+        """
+        一次性构建梅克尔树，每个非叶节点只计算一次
+        :param leaves: 底层节点的哈希值列表
+        """
+        self.leaves = list(leaves)
+        self.levels = []
+        size, depth = len(self.leaves), 0
+        while size > 1:
+            level = bytearray()
+            for i in range(0, size - 1, 2):
+                level += hash_pair(self.node(depth, i), self.node(depth, i + 1))
+            self.levels.append(level)
+            size, depth = (size + 1) // 2, depth + 1
+
+    def node(self, depth: int, index: int) -> str:
+        """
+        :param depth: 层数，底层为0
+        :param index: 节点在该层中的索引
+        :return: 节点的哈希值
+        """
+        while depth > 0:
+            level = self.levels[depth - 1]
+            if (index + 1) * HASH_SIZE <= len(level):
+                return level[index * HASH_SIZE:(index + 1) * HASH_SIZE].hex()
+            depth, index = depth - 1, index * 2  # 由下一层最后一个节点提升而来
+        return self.leaves[index]
+
+    def append(self, leaf: str) -> None:
+        """
+        添加底层节点，只重新计算新节点到根节点路径上的哈希值
+        :param leaf: 底层节点的哈希值
+        """
+        self.leaves.append(leaf)
+        index, size, depth = len(self.leaves) - 1, len(self.leaves), 0
+        while size > 1:
+            if index % 2 == 1:  # 与左侧节点配对，否则新节点被直接提升
+                if depth == len(self.levels):
+                    self.levels.append(bytearray())
+                level, offset = self.levels[depth], index // 2 * HASH_SIZE
+                level[offset:offset + HASH_SIZE] = hash_pair(self.node(depth, index - 1), self.node(depth, index))
+            index, size, depth = index // 2, (size + 1) // 2, depth + 1
 
     def add_node(self, leaf):
         """
         添加新节点
-        :param leaf: 新节点
+        :param leaf: 新节点的数据，哈希后作为底层节点
         """
-        self.leaves.append(Node(leaf))
+        self.append(sha256d(leaf))
 
     def clear(self):
         """梅尔克树清零"""
-        self.root = None
-        for leaf in self.leaves:
-            leaf.parent, leaf.bro, leaf.side = (None,) * 3
+        self.leaves = []
+        self.levels = []
 
     def get_root(self) -> Optional[str]:
         """计算梅尔克树根节点哈希值"""
         if not self.leaves:
             return None
-
-        level = self.leaves[::]
-        while len(level) != 1:
-            level = build_new_level(level)
-        self.root = level[0]
-        return self.root.val
+        return self.node(len(self.levels), 0)
 
     def get_path(self, index) -> List:
         """
@@ -120,11 +129,13 @@ class MerkleTree(Printable):
         :param index: 底层节点在列表中的索引
         :return: 路径
         """
-        path = []
-        this = self.leaves[index]
-        path.append((this.val, 'SELF'))
-        while this.parent:
-            path.append((this.bro.val, this.bro.side))
-            this = this.parent
-        path.append((this.val, 'ROOT'))
+        path = [(self.leaves[index], 'SELF')]
+        size, depth = len(self.leaves), 0
+        while size > 1:
+            if index % 2 == 1:
+                path.append((self.node(depth, index - 1), 'LEFT'))
+            elif index + 1 < size:
+                path.append((self.node(depth, index + 1), 'RIGHT'))
+            index, size, depth = index // 2, (size + 1) // 2, depth + 1
+        path.append((self.get_root(), 'ROOT'))
         return path
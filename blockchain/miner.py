@@ -0,0 +1,178 @@
+import threading
+from hashlib import sha256
+from time import time
+from typing import Optional
+
+from blockchain.block import MAX_NONCE
+from blockchain.consensus import calculate_target_bytes, search_nonce, mine_parallel
+from blockchain.params import Params
+from utils.log import logger
+from utils.verify_utils import get_verify_pool
+
+
+class Miner:
+    """
+    后台挖矿任务，链尾或交易池变化时取消当前工作并重建候选区块
+    """
+
+    def __init__(self, peer, on_found: Optional[callable] = None):
+        """
+        :param peer: 节点对象
+        :param on_found: 挖到区块后的回调函数
+        """
+        self.peer = peer
+        self.on_found = on_found
+        self.workers = Params.MINING_WORKERS
+        self.chunk = Params.MINING_CHUNK
+
+        self.block = None  # 正在挖的候选区块
+        self.hashes = 0
+        self.started_at = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.stale_event = threading.Event()  # 候选区块失效，需要重建
+        self.wake_event = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: 是否正在挖矿
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def hashrate(self) -> float:
+        """
+        :return: 本次挖矿以来的平均算力，单位：次/秒
+        """
+        if not self.started_at:
+            return 0.0
+        elapsed = time() - self.started_at
+        return self.hashes / elapsed if elapsed > 0 else 0.0
+
+    def status(self) -> dict:
+        """
+        :return: 挖矿状态
+        """
+        block = self.block
+        return {'running': self.running,
+                'workers': self.workers,
+                'hashes': self.hashes,
+                'hashrate': self.hashrate,
+                'height': len(self.peer.chain),
+                'prev_hash': block.prev_hash if block else None,
+                'txs': len(block.txs) - 1 if block else 0}
+
+    def start(self, workers: Optional[int] = None) -> bool:
+        """
+        启动后台挖矿
+        :param workers: 挖矿进程数
+        :return: 是否启动成功，已在挖矿时返回False
+        """
+        if self.running:
+            return False
+        self.workers = workers or self.workers
+        self.block = None
+        self.hashes = 0
+        self.started_at = time()
+        self.stop_event.clear()
+        self.stale_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """停止后台挖矿"""
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def notify_tip_changed(self):
+        """链尾变化，当前候选区块已成为孤块"""
+        self.stale_event.set()
+        self.wake_event.set()
+
+    def notify_pool_changed(self):
+        """交易池变化，需要重新打包交易"""
+        self.stale_event.set()
+        self.wake_event.set()
+
+    def refresh(self) -> bool:
+        """
+        从当前交易池重建候选区块
+        :return: 是否构造成功
+        """
+        self.stale_event.clear()
+        with self.peer.state_lock:  # 构造与读取候选区块之间不允许其他线程修改节点状态
+            self.peer.candidate_block = None
+            if not self.peer.create_candidate_block():
+                self.block = None
+                return False
+            self.block = self.peer.candidate_block
+        return True
+
+    def run(self):
+        """挖矿线程主循环"""
+        logger.info(f"后台挖矿：开始，进程数={self.workers}")
+        while not self.stop_event.is_set():
+            try:
+                if self.block is None or self.stale_event.is_set():
+                    self.wake_event.clear()
+                    if not self.refresh():  # 交易池为空，等待新交易
+                        self.wake_event.wait()
+                        continue
+                nonce = self.search()
+            except Exception as e:  # 异常不应静默结束挖矿线程，稍后重建候选区块
+                logger.error(f"后台挖矿：出错：{e!r}")
+                self.block = None
+                self.stop_event.wait(1)
+                continue
+            if nonce is not None:
+                block = self.block.replace(nonce=nonce)
+                self.peer.candidate_block = block
+                logger.info(f"后台挖矿：挖矿结束，nonce={nonce}")
+                if self.on_found:
+                    try:
+                        self.on_found(block)
+                    except Exception as e:
+                        logger.error(f"后台挖矿：处理新区块出错：{e!r}")
+                break
+        self.block = None
+        logger.info("后台挖矿：已停止")
+
+    def search(self) -> Optional[int]:
+        """
+        在当前候选区块上搜索nonce，直到找到、被取消或nonce空间耗尽（此时递增时戳）
+        :return: nonce值
+        """
+        block = self.block
+        if self.workers > 1:
+            cancel = _AnyEvent(self.stop_event, self.stale_event)
+            nonce, tried = mine_parallel(block, self.workers, get_verify_pool(), self.chunk, cancel)
+            self.hashes += tried
+        else:
+            midstate = sha256(block.header_prefix())
+            target = calculate_target_bytes(block.bits)
+            nonce, start = None, block.nonce
+            while nonce is None and start <= MAX_NONCE:
+                if self.stop_event.is_set() or self.stale_event.is_set():
+                    return None
+                end = min(start + self.chunk, MAX_NONCE + 1)
+                nonce = search_nonce(midstate, target, start, end)
+                self.hashes += (nonce - start + 1) if nonce is not None else end - start
+                start = end
+        if nonce is None and not (self.stop_event.is_set() or self.stale_event.is_set()):
+            self.block = block.replace_timestamp(block.timestamp + 1)
+        return nonce
+
+
+class _AnyEvent:
+    """任一事件被设置即视为被设置"""
+
+    def __init__(self, *events):
+        self.events = events
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
@@ -0,0 +1,67 @@
+from typing import Dict, List
+
+from blockchain.block import Block
+from blockchain.params import Params
+
+
+class OrphanBlocks(dict):
+    """
+    孤儿区块集合，区块哈希到区块的映射，同时按父区块哈希索引，并限制数量和占用空间
+    """
+
+    def __init__(self, max_count: int = Params.MAX_ORPHAN_BLOCKS,
+                 max_size: int = Params.MAX_ORPHAN_BLOCKS_SIZE):
+        """
+        :param max_count: 最多保存的孤儿区块数量
+        :param max_size: 孤儿区块最多占用的字节数
+        """
+        super().__init__()
+        self.max_count = max_count
+        self.max_size = max_size
+        self.size = 0
+        self.children: Dict[str, List[str]] = {}
+
+    def __setitem__(self, block_hash: str, block: Block):
+        self.add(block)
+
+    def __delitem__(self, block_hash: str):
+        block = self[block_hash]
+        super().__delitem__(block_hash)
+        self.size -= block.size
+        siblings = self.children[block.prev_hash]
+        siblings.remove(block_hash)
+        if not siblings:
+            del self.children[block.prev_hash]
+
+    def pop(self, block_hash: str, *default):
+        if block_hash not in self:
+            return super().pop(block_hash, *default)
+        block = self[block_hash]
+        del self[block_hash]
+        return block
+
+    def clear(self):
+        super().clear()
+        self.children.clear()
+        self.size = 0
+
+    def add(self, block: Block) -> None:
+        """
+        加入孤儿区块，超出数量或空间上限时淘汰最早加入的区块
+        :param block: 区块
+        """
+        if block.hash in self:
+            return
+        super().__setitem__(block.hash, block)
+        self.size += block.size
+        self.children.setdefault(block.prev_hash, []).append(block.hash)
+        while len(self) > self.max_count or self.size > self.max_size:
+            del self[next(iter(self))]
+
+    def pop_children(self, block_hash: str) -> List[Block]:
+        """
+        取出等待该区块的所有孤儿区块
+        :param block_hash: 已连接的区块哈希
+        :return: 子区块列表，按加入顺序排列
+        """
+        return [self.pop(child) for child in list(self.children.get(block_hash, ()))]
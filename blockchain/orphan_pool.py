@@ -0,0 +1,96 @@
+from time import time
+from typing import Dict, List, Optional, Set
+
+from blockchain.params import Params
+from blockchain.transaction import Pointer, Tx
+
+
+class OrphanPool(dict):
+    """
+    孤儿交易池，交易编号到交易的映射，同时按所等待的UTXO定位指针索引交易，并限制数量和存活时间
+    """
+
+    def __init__(self, max_size: int = Params.MAX_ORPHAN_TXS, expiry: int = Params.ORPHAN_TX_EXPIRY):
+        """
+        :param max_size: 最多保存的孤儿交易数量
+        :param expiry: 孤儿交易的存活时间，单位：秒
+        """
+        super().__init__()
+        self.max_size = max_size
+        self.expiry = expiry
+        self.waiting: Dict[Pointer, Set[str]] = {}
+        self.missing: Dict[str, List[Pointer]] = {}
+        self.added_at: Dict[str, float] = {}
+
+    def __setitem__(self, tx_id: str, tx: Tx):
+        self.add(tx)
+
+    def __delitem__(self, tx_id: str):
+        super().__delitem__(tx_id)
+        for pointer in self.missing.pop(tx_id):
+            tx_ids = self.waiting[pointer]
+            tx_ids.discard(tx_id)
+            if not tx_ids:
+                del self.waiting[pointer]
+        del self.added_at[tx_id]
+
+    def pop(self, tx_id: str, *default):
+        if tx_id not in self:
+            return super().pop(tx_id, *default)
+        tx = self[tx_id]
+        del self[tx_id]
+        return tx
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, dict):
+            other = other.items()
+        for _, tx in other:
+            self.add(tx)
+        for _, tx in kwargs.items():
+            self.add(tx)
+
+    def clear(self):
+        super().clear()
+        self.waiting.clear()
+        self.missing.clear()
+        self.added_at.clear()
+
+    def add(self, tx: Tx, missing: Optional[List[Pointer]] = None) -> None:
+        """
+        加入孤儿交易，数量超出上限时淘汰最早加入的交易
+        :param tx: 交易
+        :param missing: 交易等待的UTXO定位指针，默认为全部输入单元
+        """
+        if tx.id in self:
+            del self[tx.id]
+        if missing is None:
+            missing = [vin.to_spend for vin in tx.tx_in]
+        super().__setitem__(tx.id, tx)
+        self.missing[tx.id] = missing
+        self.added_at[tx.id] = time()
+        for pointer in missing:
+            self.waiting.setdefault(pointer, set()).add(tx.id)
+        while len(self) > self.max_size:
+            del self[next(iter(self))]
+
+    def waiting_on(self, pointers) -> List[str]:
+        """
+        :param pointers: 新产生的UTXO定位指针
+        :return: 等待这些UTXO的孤儿交易编号，按加入顺序排列
+        """
+        tx_ids = set()
+        for pointer in pointers:
+            tx_ids.update(self.waiting.get(pointer, ()))
+        return sorted(tx_ids, key=self.added_at.get)
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """
+        移除超过存活时间的孤儿交易
+        :param now: 当前时间
+        :return: 被移除的交易编号
+        """
+        limit = (now or time()) - self.expiry
+        expired = [tx_id for tx_id, added_at in self.added_at.items() if added_at < limit]
+        for tx_id in expired:
+            del self[tx_id]
+        return expired
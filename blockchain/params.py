@@ -12,3 +12,33 @@ class Params:
     DEFAULT_FEE = 0  # 默认交易费
     AVG_MINING_TIME = 10  # 平均挖矿时间，单位：秒
     TOTAL_BLOCK = 20  # 难度调整间隔
+    MINING_WORKERS = 1  # 挖矿进程数，大于1时并行搜索nonce
+    MINING_CHUNK = 1 << 16  # 并行挖矿时每次分配的nonce区间大小
+    VERIFY_WORKERS = None  # 并行验证签名的进程数，None表示使用全部CPU核心
+    PARALLEL_VERIFY_MIN_BATCH = 32  # 签名数量达到该值时才使用进程池并行验证
+    SIGNATURE_CACHE_SIZE = 100000  # 签名验证缓存的最大条目数
+    KEY_CACHE_SIZE = 10000  # 公钥对象与地址缓存的最大条目数
+    MAX_MEMPOOL_SIZE = 64 * 1024 * 1024  # 交易池中交易的最大总字节数，超出时按费率淘汰
+    MEMPOOL_EXPIRY = 14 * 24 * 60 * 60  # 交易在交易池中的存活时间，单位：秒
+    MAX_ANCESTORS = 25  # 交易与其交易池内祖先交易的最大数量
+    MAX_DESCENDANTS = 25  # 交易与其交易池内后代交易的最大数量
+    MAX_ORPHAN_TXS = 100  # 孤儿交易池的最大交易数
+    ORPHAN_TX_EXPIRY = 20 * 60  # 孤儿交易的存活时间，单位：秒
+    MAX_ORPHAN_BLOCKS = 100  # 最多保存的孤儿区块数量
+    MAX_ORPHAN_BLOCKS_SIZE = 32 * 1024 * 1024  # 孤儿区块最多占用的字节数
+    MAX_BLOCK_SIZE = 1024 * 1024  # 区块序列化后的最大字节数，打包交易时不超过该值
+    BLOCK_FILE_SIZE = 16 * 1024 * 1024  # 区块存储单个分段文件的最大字节数
+    SNAPSHOT_INTERVAL = 100  # 主链每增长该数量的区块写一次链状态快照
+    COIN_SELECTION = 'branch-and-bound'  # 默认的选币策略
+    BNB_MAX_TRIES = 20000  # 分支定界选币的最大搜索步数
+    KNAPSACK_ITERATIONS = 1000  # 背包选币的随机逼近轮数
+    PARALLEL_SIGN_MIN_BATCH = 32  # 待签名数量达到该值时才使用进程池并行签名
+    MAX_REORG_DEPTH = 100  # 保留撤销记录的区块数，即可处理的最大重组深度
+    MAX_HEADERS_PER_REQUEST = 2000  # 每次同步最多返回的区块头数量
+    MAX_BLOCKS_PER_REQUEST = 100  # 每次请求最多返回的区块数量
+    REQUEST_TIMEOUT = 10  # 向其他节点请求区块头或区块的超时时间，单位：秒
+    DOWNLOAD_WINDOW = 16  # 并行下载时已请求但尚未连接的区块段数量上限
+    DOWNLOAD_TIMEOUT = 15  # 单个节点下载一段区块的超时时间，超时后改由其他节点下载，单位：秒
+    BLOCK_JSON_CACHE_SIZE = 1000  # 区块JSON编码缓存的最大条目数
+    ASSUME_VALID = None  # 假定有效的区块哈希，该区块及其祖先在同步时跳过签名验证
+    CHECKPOINTS = {}  # 检查点，高度到区块哈希；主链在这些高度上必须是指定区块，之前的区块跳过签名验证
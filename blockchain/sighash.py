@@ -0,0 +1,26 @@
+from hashlib import sha256
+from typing import List
+
+from blockchain.transaction import Pointer, Vout
+from utils.hash_utils import build_message
+from utils.serialize_utils import pack_bytes, pack_list
+
+
+class SigHash:
+    """
+    交易签名明文的计算器，输出列表只序列化并哈希一次，各输入单元的明文由其派生
+    """
+
+    def __init__(self, tx_out: List[Vout]):
+        """
+        :param tx_out: 交易的输出列表
+        """
+        self.outputs_hash = sha256(sha256(pack_list(tx_out)).digest()).digest()
+
+    def message(self, pk: bytes, pointer: Pointer) -> bytes:
+        """
+        :param pk: 公钥字符串
+        :param pointer: 输入单元使用的UTXO定位指针
+        :return: 该输入单元的签名明文
+        """
+        return build_message(pointer.serialize() + pack_bytes(pk) + self.outputs_hash)
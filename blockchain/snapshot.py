@@ -0,0 +1,91 @@
+import mmap
+import os
+import struct
+from hashlib import sha256
+from typing import List
+
+from blockchain.transaction import Tx, UTXO
+from utils.log import logger
+from utils.printable import Printable
+from utils.serialize_utils import pack_list, Reader
+
+# 快照文件：魔数 | 版本 | 链尾高度 | 链尾哈希 | UTXO列表 | 交易池列表 | 校验和
+SNAPSHOT_MAGIC = b'BCSS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sII32s')
+CHECKSUM_SIZE = 32
+
+
+class Snapshot(Printable):
+    """
+    某一链尾高度的链状态快照，包含UTXO集合与交易池，重启时只需重放快照之后的区块
+    """
+
+    def __init__(self, height: int, tip_hash: str, utxos: List[UTXO], txs: List[Tx]):
+        """
+        :param height: 链尾高度
+        :param tip_hash: 链尾区块哈希
+        :param utxos: UTXO列表
+        :param txs: 交易池中的交易
+        """
+        self.height = height
+        self.tip_hash = tip_hash
+        self.utxos = utxos
+        self.txs = txs
+
+    def serialize(self) -> bytes:
+        """
+        :return: 带校验和的二进制编码
+        """
+        data = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.height, bytes.fromhex(self.tip_hash)) \
+            + pack_list(self.utxos) + pack_list(self.txs)
+        return data + sha256(data).digest()
+
+    @classmethod
+    def deserialize(cls, data):
+        """
+        :param data: 字节串或内存映射
+        :return: 快照对象，魔数、版本或校验和不符时返回None
+        """
+        if len(data) < SNAPSHOT_HEADER.size + CHECKSUM_SIZE:
+            return None
+        end = len(data) - CHECKSUM_SIZE
+        with memoryview(data) as view:
+            if sha256(view[:end]).digest() != view[end:]:
+                return None
+        reader = Reader(data)
+        magic, version, height, tip_hash = reader.unpack(SNAPSHOT_HEADER)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            return None
+        return Snapshot(height, tip_hash.hex(), reader.list(UTXO), reader.list(Tx))
+
+    def save(self, filename: str) -> None:
+        """
+        先写入临时文件再替换，避免写入中断破坏旧快照
+        :param filename: 快照文件地址
+        """
+        tmp = filename + '.tmp'
+        with open(tmp, mode='wb') as f:
+            f.write(self.serialize())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+
+    @classmethod
+    def load(cls, filename: str):
+        """
+        通过内存映射读取快照
+        :param filename: 快照文件地址
+        :return: 快照对象，文件不存在或已损坏时返回None
+        """
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            return None
+        with open(filename, mode='rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                try:
+                    snapshot = cls.deserialize(mm)
+                except ValueError:
+                    snapshot = None
+        if snapshot is None:
+            logger.info(f"加载快照：{filename}已损坏")
+        return snapshot
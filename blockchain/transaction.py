@@ -2,10 +2,11 @@ import os
 from typing import List
 
 from utils.hash_utils import sha256d
-from utils.printable import Printable
+from utils.printable import Printable, Frozen
+from utils.serialize_utils import pack_bytes, pack_int, pack_list, pack_str, pack_uint, Reader
 
 
-class Pointer(Printable):
+class Pointer(Frozen):
     """
     输入单元中指向其金额来源的定位指针
     """
@@ -17,6 +18,21 @@ class Pointer(Printable):
         """
         self.tx_id = tx_id
         self.n = n
+        self.freeze()
+
+    def serialize(self) -> bytes:
+        """
+        :return: 规范的二进制编码
+        """
+        return pack_str(self.tx_id) + pack_uint(self.n)
+
+    @classmethod
+    def deserialize(cls, reader: Reader):
+        """
+        :param reader: 读取器
+        :return: Pointer对象
+        """
+        return Pointer(reader.str(), reader.uint())
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -27,7 +43,7 @@ class Pointer(Printable):
         return hash((self.tx_id, self.n))
 
 
-class Vin(Printable):
+class Vin(Frozen):
     """
     交易的输入单元
     """
@@ -41,6 +57,23 @@ class Vin(Printable):
         self.to_spend = to_spend
         self.signature = signature
         self.pubkey = pubkey
+        self.freeze()
+
+    def serialize(self) -> bytes:
+        """
+        :return: 规范的二进制编码
+        """
+        to_spend = b'\x01' + self.to_spend.serialize() if self.to_spend else b'\x00'
+        return to_spend + pack_bytes(self.signature) + pack_bytes(self.pubkey)
+
+    @classmethod
+    def deserialize(cls, reader: Reader):
+        """
+        :param reader: 读取器
+        :return: Vin对象
+        """
+        to_spend = Pointer.deserialize(reader) if reader.read(1) == b'\x01' else None
+        return Vin(to_spend, reader.bytes(), reader.bytes())
 
     @property
     def sig_script(self) -> bytes:
@@ -53,11 +86,11 @@ class Vin(Printable):
         if isinstance(other, self.__class__):
             return self.to_spend == other.to_spend and \
                    self.signature == other.signature and \
-                   self.pubkey == self.pubkey
+                   self.pubkey == other.pubkey
         return False
 
 
-class Vout(Printable):
+class Vout(Frozen):
     """
     交易的输出单元
     """
@@ -69,6 +102,21 @@ class Vout(Printable):
         """
         self.to_addr = to_addr
         self.value = value
+        self.freeze()
+
+    def serialize(self) -> bytes:
+        """
+        :return: 规范的二进制编码
+        """
+        return pack_str(self.to_addr) + pack_int(self.value)
+
+    @classmethod
+    def deserialize(cls, reader: Reader):
+        """
+        :param reader: 读取器
+        :return: Vout对象
+        """
+        return Vout(reader.str(), reader.int())
 
     @property
     def pubkey_script(self) -> str:
@@ -83,7 +131,7 @@ class Vout(Printable):
         return False
 
 
-class Tx(Printable):
+class Tx(Frozen):
     """交易"""
 
     def __init__(self, tx_in: List[Vin] = None, tx_out: List[Vout] = None, fee: int = 0):
@@ -91,9 +139,27 @@ class Tx(Printable):
         :param tx_in: 交易输入单元的集合
         :param tx_out: 交易输出单元的集合
         """
-        self.tx_in = tx_in
-        self.tx_out = tx_out
+        self.tx_in = tuple(tx_in) if tx_in is not None else None
+        self.tx_out = tuple(tx_out) if tx_out is not None else None
         self.fee = fee
+        data = self.serialize()
+        self._id = sha256d(data)  # 交易构造后不再改变，编号只计算一次
+        self._size = len(data)
+        self.freeze()
+
+    def serialize(self) -> bytes:
+        """
+        :return: 规范的二进制编码
+        """
+        return pack_list(self.tx_in) + pack_list(self.tx_out) + pack_int(self.fee)
+
+    @classmethod
+    def deserialize(cls, reader: Reader):
+        """
+        :param reader: 读取器
+        :return: Tx对象
+        """
+        return Tx(reader.list(Vin), reader.list(Vout), reader.int())
 
     @property
     def is_coinbase(self) -> bool:
@@ -118,7 +184,14 @@ class Tx(Printable):
         """
         :return: 交易编号
         """
-        return sha256d(f"{self.tx_in}{self.tx_out}{self.fee}")
+        return self._id
+
+    @property
+    def size(self) -> int:
+        """
+        :return: 交易编码后的字节数
+        """
+        return self._size
 
     @classmethod
     def from_dict(cls, dic):
@@ -175,6 +248,24 @@ class UTXO(Printable):
         """
         return UTXO(self.vout, self.pointer, self.is_coinbase, unspent, confirmed)
 
+    def serialize(self) -> bytes:
+        """
+        :return: 规范的二进制编码，状态位依次为is_coinbase、unspent、confirmed
+        """
+        flags = self.is_coinbase | self.unspent << 1 | self.confirmed << 2
+        return self.pointer.serialize() + self.vout.serialize() + bytes([flags])
+
+    @classmethod
+    def deserialize(cls, reader: Reader):
+        """
+        :param reader: 读取器
+        :return: UTXO对象
+        """
+        pointer = Pointer.deserialize(reader)
+        vout = Vout.deserialize(reader)
+        flags = reader.read(1)[0]
+        return UTXO(vout, pointer, bool(flags & 1), bool(flags & 2), bool(flags & 4))
+
     @classmethod
     def from_dict(cls, dic):
         """
@@ -0,0 +1,23 @@
+from typing import Dict, List
+
+from blockchain.transaction import Pointer, Tx, UTXO
+from utils.printable import Printable
+
+
+class UndoRecord(Printable):
+    """
+    连接区块时对UTXO集合与交易池所做修改的撤销记录，用于断开区块
+    """
+
+    def __init__(self, spent_utxos: List[UTXO], created_pointers: List[Pointer],
+                 replaced_utxos: List[UTXO], removed_txs: Dict[str, Tx]):
+        """
+        :param spent_utxos: 被区块交易花费而移除的UTXO
+        :param created_pointers: 区块交易产生的UTXO定位指针
+        :param replaced_utxos: 被确认UTXO覆盖的交易池UTXO
+        :param removed_txs: 从交易池中移除的交易
+        """
+        self.spent_utxos = spent_utxos
+        self.created_pointers = created_pointers
+        self.replaced_utxos = replaced_utxos
+        self.removed_txs = removed_txs
@@ -0,0 +1,113 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+from blockchain.transaction import Pointer, UTXO
+
+
+class UTXOSet(dict):
+    """
+    UTXO集合，定位指针到UTXO的映射，同时维护地址到UTXO的索引与各地址的余额
+    """
+
+    def __init__(self, utxos=None):
+        """
+        :param utxos: 初始UTXO，定位指针到UTXO的映射
+        """
+        super().__init__()
+        self.by_addr: Dict[str, Dict[Pointer, UTXO]] = {}
+        self.balances: Dict[str, int] = {}  # 各地址未被消费的UTXO金额之和
+        self.sorted_keys: Dict[str, List[Tuple[int, str, int]]] = {}  # 各地址未被消费的UTXO按金额升序排列
+        if utxos:
+            self.update(utxos)
+
+    def __setitem__(self, pointer: Pointer, utxo: UTXO):
+        if pointer in self:
+            self._unindex(self[pointer])
+        super().__setitem__(pointer, utxo)
+        addr = utxo.vout.to_addr
+        self.by_addr.setdefault(addr, {})[pointer] = utxo
+        if utxo.unspent:
+            self.balances[addr] = self.balances.get(addr, 0) + utxo.vout.value
+            insort(self.sorted_keys.setdefault(addr, []), _sort_key(utxo))
+
+    def __delitem__(self, pointer: Pointer):
+        utxo = self[pointer]
+        super().__delitem__(pointer)
+        self._unindex(utxo)
+
+    def _unindex(self, utxo: UTXO):
+        addr = utxo.vout.to_addr
+        utxos = self.by_addr.get(addr)
+        if utxos is not None and utxos.pop(utxo.pointer, None) is not None and not utxos:
+            del self.by_addr[addr]
+        if utxo.unspent:
+            balance = self.balances[addr] - utxo.vout.value
+            if addr in self.by_addr:
+                self.balances[addr] = balance
+            else:
+                del self.balances[addr]
+            keys = self.sorted_keys[addr]
+            del keys[bisect_left(keys, _sort_key(utxo))]
+            if not keys:
+                del self.sorted_keys[addr]
+
+    def pop(self, pointer: Pointer, *default):
+        if pointer not in self:
+            return super().pop(pointer, *default)
+        utxo = self[pointer]
+        del self[pointer]
+        return utxo
+
+    def popitem(self):
+        pointer, utxo = super().popitem()
+        self._unindex(utxo)
+        return pointer, utxo
+
+    def setdefault(self, pointer: Pointer, utxo: UTXO = None):
+        if pointer not in self:
+            self[pointer] = utxo
+        return self[pointer]
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, dict):
+            other = other.items()
+        for pointer, utxo in other:
+            self[pointer] = utxo
+
+    def clear(self):
+        super().clear()
+        self.by_addr.clear()
+        self.balances.clear()
+        self.sorted_keys.clear()
+
+    def utxos_of(self, addr: str, unspent_only: bool = True) -> List[UTXO]:
+        """
+        :param addr: 地址
+        :param unspent_only: 是否只返回未被消费的UTXO
+        :return: 属于该地址的UTXO列表
+        """
+        utxos = self.by_addr.get(addr, {}).values()
+        return [utxo for utxo in utxos if utxo.unspent or not unspent_only]
+
+    def sorted_utxos_of(self, addr: str) -> List[UTXO]:
+        """
+        :param addr: 地址
+        :return: 该地址未被消费的UTXO，按金额从小到大排列，无需重新排序
+        """
+        utxos = self.by_addr.get(addr, {})
+        return [utxos[Pointer(tx_id, n)] for _, tx_id, n in self.sorted_keys.get(addr, [])]
+
+    def balance_of(self, addr: str) -> int:
+        """
+        :param addr: 地址
+        :return: 该地址的余额
+        """
+        return self.balances.get(addr, 0)
+
+
+def _sort_key(utxo: UTXO) -> Tuple[int, str, int]:
+    """
+    :param utxo: UTXO
+    :return: 按金额排序的唯一键
+    """
+    return utxo.vout.value, utxo.pointer.tx_id, utxo.pointer.n
@@ -2,8 +2,8 @@ from typing import List
 
 import ecdsa
 
-from blockchain.params import Params
-from utils.hash_utils import convert_pubkey_to_addr, sha256d
+from utils.cache_utils import signature_cache, key_cache
+from utils.hash_utils import sha256d
 
 
 class StackMachine(object):
@@ -100,21 +100,34 @@ class StackMachine(object):
         """判断栈顶与次栈顶是否相等，结果入栈"""
         self.push(self.pop() == self.pop())
 
+    def verify(self, pk_str, sig) -> bool:
+        """
+        验证当前明文的签名，验证成功的结果写入签名缓存
+        :param pk_str: 公钥字符串
+        :param sig: 签名
+        :return: 签名是否匹配
+        """
+        key = (sig, pk_str, self.message)
+        if signature_cache.contains(key):
+            return True
+        vk = key_cache.verifying_key(pk_str)
+        try:
+            vk.verify(sig, self.message)
+        except ecdsa.BadSignatureError:
+            return False
+        signature_cache.add(key)
+        return True
+
     def check_sig(self):
         """验证签名"""
         pk_str = self.pop()
         sig = self.pop()
-        vk = ecdsa.VerifyingKey.from_string(pk_str, curve=Params.CURVE)
-        try:
-            vk.verify(sig, self.message)
-            self.push(True)
-        except ecdsa.BadSignatureError:
-            self.push(False)
+        self.push(self.verify(pk_str, sig))
 
     def calc_addr(self):
         """计算地址"""
         pk_str = self.pop()
-        self.push(convert_pubkey_to_addr(pk_str))
+        self.push(key_cache.address(pk_str))
 
     def check_mulsig(self):
         """验证多重签名"""
@@ -124,12 +137,7 @@ class StackMachine(object):
         sigs = [self.pop() for _ in range(m)]
         pk_strs = pk_strs[-m:]
         for i in range(m):
-            vk = ecdsa.VerifyingKey.from_string(pk_strs[i], curve=Params.CURVE)
-            flag = True
-            try:
-                vk.verify(sigs[i], self.message)
-            except ecdsa.BadSignatureError:
-                flag = False
+            flag = self.verify(pk_strs[i], sigs[i])
             if not flag:
                 break
             self.push(flag)
@@ -1,11 +1,25 @@
+import multiprocessing
 from typing import List, Optional
 
 import ecdsa
 
 from blockchain.params import Params
+from blockchain.sighash import SigHash
 from blockchain.transaction import Pointer, Vout
-from utils.hash_utils import convert_pubkey_to_addr, build_message
+from utils.hash_utils import convert_pubkey_to_addr
 from utils.printable import Printable
+from utils.verify_utils import get_verify_pool
+
+
+def sign_messages_job(job) -> List[bytes]:
+    """
+    签名一组明文，供工作进程调用；每组只构造一次私钥对象
+    :param job: (私钥字符串, 明文列表)
+    :return: 签名列表
+    """
+    sk_str, messages = job
+    sk = ecdsa.SigningKey.from_string(sk_str, curve=Params.CURVE)
+    return [sk.sign(message) for message in messages]
 
 
 class Wallet(Printable):
@@ -36,18 +50,32 @@ class Wallet(Printable):
     def sign(self, message: bytes) -> bytes:
         return self.sk.sign(message)
 
+    def sign_batch(self, messages: List[bytes]) -> List[bytes]:
+        """
+        批量签名，数量达到阈值时在进程池中并行签名
+        :param messages: 明文列表
+        :return: 与明文一一对应的签名列表
+        """
+        if len(messages) < Params.PARALLEL_SIGN_MIN_BATCH:
+            return [self.sign(message) for message in messages]
+        n = Params.VERIFY_WORKERS or multiprocessing.cpu_count()
+        sk_str = self.sk.to_string()
+        jobs = [(sk_str, messages[i::n]) for i in range(n) if messages[i::n]]
+        signatures = [None] * len(messages)
+        for i, chunk in enumerate(get_verify_pool().map(sign_messages_job, jobs)):  # 复用签名验证进程池
+            signatures[i::n] = chunk
+        return signatures
+
     @classmethod
     def create_signature_message(cls, pk: bytes, pointer: Pointer, tx_out: List[Vout]) -> bytes:
         """
-        创建签名明文
+        创建签名明文，同一交易的多个输入应直接使用SigHash以避免重复哈希输出列表
         :param pk: 公钥字符串
         :param pointer: 使用的UTXO的定位指针
         :param tx_out: 输出列表
         :return: 签名明文
         """
-        string = str(pointer) + str(pk) + str(tx_out)
-        message = build_message(string)
-        return message
+        return SigHash(tx_out).message(pk, pointer)
 
     def save_keys(self, filename: Optional[str] = None) -> None:
         if self.sk is None:
@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import time
+from typing import Callable, Dict, List
+
+from blockchain.block import Block
+from blockchain.params import Params
+from utils.log import logger
+from utils.network_utils import request_blocks
+
+
+class BlockDownloader:
+    """
+    按区块头把高度区间分段，分配给多个节点并行下载；限制在途的区块段数量，
+    超时或失败的段改由其他节点下载，区块按高度顺序连接
+    """
+
+    def __init__(self, peer, nodes: List[tuple], start: int, headers: List[Block],
+                 batch: int = Params.MAX_BLOCKS_PER_REQUEST,
+                 window: int = Params.DOWNLOAD_WINDOW,
+                 timeout: float = Params.DOWNLOAD_TIMEOUT,
+                 fetch: Callable[[tuple, int, int], List[Block]] = request_blocks):
+        """
+        :param peer: 节点对象，用于连接下载到的区块
+        :param nodes: 可下载区块的节点地址
+        :param start: 第一个区块头的高度
+        :param headers: 已验证的区块头
+        :param batch: 每段的区块数
+        :param window: 已请求但尚未连接的段数上限
+        :param timeout: 单段下载的超时时间，单位：秒
+        :param fetch: 下载函数，参数为(节点地址, 起始高度, 结束高度)
+        """
+        self.peer = peer
+        self.nodes = list(dict.fromkeys(nodes))
+        self.start = start
+        self.headers = headers
+        self.batch = batch
+        self.window = window
+        self.timeout = timeout
+        self.fetch = fetch
+
+        self.segments = (len(headers) + batch - 1) // batch
+        self.pending = list(range(self.segments))  # 等待分配的段，按高度升序
+        self.in_flight: Dict = {}  # future -> (段序号, 节点地址, 请求时间)
+        self.busy = set()  # 有在途请求的节点
+        self.downloaded: Dict[int, List[Block]] = {}  # 已下载、等待连接的段
+        self.next_segment = 0  # 下一个需要连接的段
+
+    def segment_range(self, segment: int) -> tuple:
+        """
+        :param segment: 段序号
+        :return: 该段在headers中的下标区间
+        """
+        begin = segment * self.batch
+        return begin, min(begin + self.batch, len(self.headers))
+
+    def drop_node(self, node: tuple, reason: str) -> None:
+        """
+        不再向该节点分配下载任务
+        :param node: 节点地址
+        :param reason: 原因
+        """
+        if node in self.nodes:
+            self.nodes.remove(node)
+        logger.info(f"下载区块：{node}{reason}，其区块段改由其他节点下载")
+
+    def assign(self, executor) -> None:
+        """将等待中的段分配给空闲节点，不超过在途窗口"""
+        idle = [node for node in self.nodes if node not in self.busy]
+        while self.pending and idle and self.pending[0] < self.next_segment + self.window:
+            segment = self.pending.pop(0)
+            node = idle.pop(0)
+            begin, end = self.segment_range(segment)
+            future = executor.submit(self.fetch, node, self.start + begin, self.start + end)
+            self.in_flight[future] = (segment, node, time())
+            self.busy.add(node)
+
+    def collect(self, future) -> None:
+        """
+        处理已完成的下载请求，区块与区块头不符或请求失败时重新分配该段
+        :param future: 已完成的请求
+        """
+        segment, node, _ = self.in_flight.pop(future)
+        self.busy.discard(node)
+        begin, end = self.segment_range(segment)
+        try:
+            blocks = future.result()
+        except Exception as e:
+            blocks = None
+            self.drop_node(node, f"请求失败（{e}）")
+        else:
+            if [block.hash for block in blocks] != [header.hash for header in self.headers[begin:end]]:
+                blocks = None
+                self.drop_node(node, "返回的区块与区块头不符")
+        if blocks is None:
+            self.pending.insert(0, segment)
+            self.pending.sort()
+        else:
+            self.downloaded[segment] = blocks
+
+    def expire(self) -> None:
+        """超时的请求视为失败，放弃其结果并重新分配该段"""
+        now = time()
+        for future, (segment, node, requested_at) in list(self.in_flight.items()):
+            if now - requested_at > self.timeout:
+                del self.in_flight[future]
+                self.busy.discard(node)
+                self.drop_node(node, "下载超时")
+                self.pending.append(segment)
+                self.pending.sort()
+
+    def connect(self) -> bool:
+        """
+        按高度顺序连接已下载的段
+        :return: 是否所有区块均连接成功
+        """
+        while self.next_segment in self.downloaded:
+            for block in self.downloaded.pop(self.next_segment):
+                self.peer.receive_block(block)
+                if self.peer.chain.height_of(block.hash) == -1 and block.hash not in self.peer.side_blocks:
+                    logger.info("下载区块：区块验证失败，停止下载")
+                    return False
+            self.next_segment += 1
+        return True
+
+    def run(self) -> bool:
+        """
+        下载并连接全部区块
+        :return: 是否全部下载并连接
+        """
+        if not self.segments:
+            return True
+        executor = ThreadPoolExecutor(max_workers=2 * max(len(self.nodes), 1))
+        try:
+            while self.next_segment < self.segments:
+                self.assign(executor)
+                if not self.in_flight:
+                    logger.info("下载区块：没有可用的节点")
+                    return False
+                done, _ = wait(list(self.in_flight), timeout=self.timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in self.in_flight:
+                        self.collect(future)
+                self.expire()
+                if not self.connect():
+                    return False
+            return True
+        finally:
+            for future in self.in_flight:  # 取消尚未开始的请求
+                future.cancel()
+            executor.shutdown(wait=False)  # 不等待已超时或正在进行的请求
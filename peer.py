@@ -1,18 +1,45 @@
 import json
 import threading
+from functools import wraps
 from os.path import exists
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import httpx
 
-from blockchain.consensus import mine
+from blockchain.block_store import BlockStore
+from blockchain.chain import Chain
+from blockchain.coin_selection import select_coins
+from blockchain.consensus import mine_block
+from blockchain.mem_pool import MemPool
+from blockchain.miner import Miner
+from blockchain.orphan_blocks import OrphanBlocks
+from blockchain.orphan_pool import OrphanPool
+from blockchain.sighash import SigHash
+from blockchain.snapshot import Snapshot
 from blockchain.transaction import Vout, Vin
+from blockchain.undo import UndoRecord
+from blockchain.utxo_set import UTXOSet
+from blockchain.wallet import Wallet
+from p2p.downloader import BlockDownloader
 from p2p.node import P2PNode
+from utils.cache_utils import LRUCache
 from utils.json_utils import MyJSONEncoder
+from utils.network_utils import request_headers, request_blocks
 from utils.transaction_utils import *
 from utils.verify_utils import *
 
 
+def synchronized(method):
+    """在节点状态锁内执行方法，后台挖矿线程与请求处理线程不会同时读写链、交易池和UTXO集合"""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.state_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 def broadcast(peers: List[tuple], payload: dict, payload_type: str):
     """
     广播区块或者交易
@@ -39,6 +66,8 @@ class Peer:
                  wallet_file: str = 'wallet_{0}.txt',
                  blockchain_file: str = 'blockchain_{0}.txt',
                  genesis_block_file: str = 'genesis_block.txt',
+                 block_store_dir: str = 'blocks_{0}',
+                 snapshot_file: str = 'snapshot_{0}.dat',
                  port: int = 5000,
                  ws_notify: Optional[callable] = None):
         """
@@ -46,35 +75,44 @@ class Peer:
         :param wallet_file: 钱包文件地址
         :param blockchain_file: 本地区块链文件地址
         :param genesis_block_file: 创世区块文件地址
+        :param block_store_dir: 区块存储目录
+        :param snapshot_file: 链状态快照文件地址
         :param port: 绑定的端口
         :param ws_notify: websocket回调函数
         """
         self.wallet_file = wallet_file.format(port)
         self.blockchain_file = blockchain_file.format(port)
         self.genesis_block_file = genesis_block_file
+        self.block_store = BlockStore(block_store_dir.format(port))
+        self.snapshot_file = snapshot_file.format(port)
+        self.snapshot_height = -1  # 最近一次快照的链尾高度
+        self.snapshot_hash = None
 
-        self.chain = []
+        self.chain = Chain()
         self.txs = []  # 离线交易
-        self.utxo_set: Dict[Pointer, UTXO] = {}
-        self.mem_pool: Dict[str, Tx] = {}
-        self.orphan_pool: Dict[str, Tx] = {}
+        self.utxo_set = UTXOSet()
+        self.mem_pool = MemPool()
+        self.orphan_pool = OrphanPool()
         self.wallet = Wallet(self.wallet_file)
         self.allow_utxo_from_pool = False
-        self.orphan_block = []
+        self.orphan_block = OrphanBlocks()
+        self.side_blocks = OrphanBlocks()  # 父区块已知但不在主链上的分支区块
+        self.undo_records: Dict[str, UndoRecord] = {}  # 区块哈希到连接该区块时的撤销记录
+        self.block_json_cache = LRUCache(Params.BLOCK_JSON_CACHE_SIZE)  # 区块哈希到JSON编码，区块不可变
+        self.assumed_valid = set()  # 假定有效区块或检查点的祖先区块，连接时跳过签名验证
         self.candidate_block = None
         self.fee = Params.DEFAULT_FEE
+        self.mining_workers = Params.MINING_WORKERS
+        self.coin_selection = Params.COIN_SELECTION  # 选币策略
 
-        self.__utxos_from_vins = []
-        self.__utxos_from_vouts = []
-        self.__pointers_from_vouts = []
-        self.__txs_removed = {}
-
+        self.miner = Miner(self)
         self.p2p_node = P2PNode(port=port, blockchain=self)
         self.ws_notify = ws_notify
 
         self.longest_node = None
         self.longest_chain_length = 0
         self.longest_lock = threading.Lock()
+        self.state_lock = threading.RLock()  # 保护链、交易池和UTXO集合，可重入：接收区块时会接收孤儿交易
 
     def init(self):
         """从本地文件（若存在）初始化节点"""
@@ -130,19 +168,19 @@ class Peer:
         """
         self.wallet.generate_key()
 
-    def get_utxos(self):
+    def get_utxos(self, addr: Optional[str] = None) -> List[UTXO]:
         """
-        :return: 自己未消费的UTXO列表
+        :param addr: 地址，默认为自己的钱包地址
+        :return: 该地址未消费的UTXO列表
         """
-        return [utxo for utxo in self.utxo_set.values()
-                if utxo.vout.to_addr == self.addr and utxo.unspent]
+        return self.utxo_set.utxos_of(addr or self.addr)
 
-    def get_balance(self) -> int:
+    def get_balance(self, addr: Optional[str] = None) -> int:
         """
-        :return: 自身余额
+        :param addr: 地址，默认为自己的钱包地址
+        :return: 该地址的余额
         """
-        utxos = self.get_utxos()
-        return sum([utxo.vout.value for utxo in utxos])
+        return self.utxo_set.balance_of(addr or self.addr)
 
     def create_transaction(self, to_addr: str, value: int) -> bool:
         """
@@ -151,26 +189,23 @@ class Peer:
         :param value: 交易金额
         :return: 是否创建成功
         """
-        utxos, balance = self.get_utxos(), self.get_balance()
-        utxos = sorted(utxos, key=lambda u: u.vout.value)  # 按金额从小到大排序
-        if balance < value:  # 余额不足
+        if self.get_balance() < value:  # 余额不足
+            logger.info("创建交易失败：余额不足！")
+            return False
+        utxos = select_coins(self.utxo_set.sorted_utxos_of(self.addr), value, self.coin_selection)
+        if utxos is None:
             logger.info("创建交易失败：余额不足！")
             return False
         tx_in, tx_out = [], []
-        need_to_spend = 0
-        n = 0  # 前n个UTXO
-        for i, utxo in enumerate(utxos):
-            need_to_spend += utxo.vout.value
-            if need_to_spend >= value:
-                n = i + 1
-                break
+        need_to_spend = sum(utxo.vout.value for utxo in utxos)
         if need_to_spend > value:  # 需要找零
             tx_out.append(Vout(to_addr=to_addr, value=value - self.fee))
             tx_out.append(Vout(to_addr=self.addr, value=need_to_spend - value))
         else:
             tx_out.append(Vout(to_addr=to_addr, value=value - self.fee))
-        for utxo in utxos[:n]:
-            message = self.wallet.create_signature_message(self.pk, utxo.pointer, tx_out)
+        sighash = SigHash(tx_out)
+        for utxo in utxos:
+            message = sighash.message(self.pk, utxo.pointer)
             signature = self.wallet.sign(message)
             tx_in.append(Vin(to_spend=utxo.pointer, signature=signature, pubkey=self.pk))
             # self.utxo_set[utxo.pointer] = utxo.replace(unspent=False)
@@ -179,21 +214,110 @@ class Peer:
         self.txs.append(tx)
         return True
 
-    def receive_transaction(self, tx: Tx) -> bool:
+    def create_transactions(self, payments: List[Tuple[str, int]], split: bool = False) -> bool:
+        """
+        批量付款，与create_transaction相同，交易费从收款金额中扣除，每条交易从其第一笔付款中扣除一次；全部签名完成后一次性加入离线交易
+        :param payments: (交易目标, 交易金额)列表
+        :param split: 为False时构造一条多输出交易，否则每笔付款一条交易，各交易花费的UTXO互不相交
+        :return: 是否创建成功，失败时不加入任何交易
+        """
+        if not payments or any(value <= 0 for _, value in payments):
+            logger.info("批量创建交易失败：参数错误！")
+            return False
+        groups = [payments] if not split else [[payment] for payment in payments]
+        if any(group[0][1] <= self.fee for group in groups):
+            logger.info("批量创建交易失败：付款金额不足以支付交易费！")
+            return False
+        available = self.utxo_set.sorted_utxos_of(self.addr)
+        plans = []  # (花费的UTXO, 输出列表)
+        for group in groups:
+            need_to_spend = sum(value for _, value in group)
+            utxos = select_coins(available, need_to_spend, self.coin_selection)
+            if utxos is None:
+                logger.info("批量创建交易失败：余额不足！")
+                return False
+            tx_out = [Vout(to_addr=to_addr, value=value - (self.fee if i == 0 else 0))
+                      for i, (to_addr, value) in enumerate(group)]
+            change = sum(utxo.vout.value for utxo in utxos) - need_to_spend
+            if change > 0:
+                tx_out.append(Vout(to_addr=self.addr, value=change))
+            plans.append((utxos, tx_out))
+            if split:
+                spent = {utxo.pointer for utxo in utxos}
+                available = [utxo for utxo in available if utxo.pointer not in spent]
+
+        messages = []
+        for utxos, tx_out in plans:
+            sighash = SigHash(tx_out)
+            messages.extend(sighash.message(self.pk, utxo.pointer) for utxo in utxos)
+        signatures = iter(self.wallet.sign_batch(messages))
+        txs = []
+        for utxos, tx_out in plans:
+            tx_in = [Vin(to_spend=utxo.pointer, signature=next(signatures), pubkey=self.pk) for utxo in utxos]
+            txs.append(Tx(tx_in=tx_in, tx_out=tx_out, fee=self.fee))
+        logger.info(f"批量创建交易：{len(txs)}条交易，{len(payments)}笔付款")
+        self.txs.extend(txs)
+        return True
+
+    @synchronized
+    def receive_transaction(self, tx: Tx, check_signatures: bool = True) -> bool:
         """
         接收交易并将其放入交易池中
         :param tx: 交易
+        :param check_signatures: 是否验证数字签名，签名已预先验证时为False
         :return: 是否成功
         """
         if isinstance(tx, Tx) and (tx.id not in self.mem_pool):
-            if verify_tx(self, tx, self.mem_pool):
+            if verify_tx(self, tx, self.mem_pool, check_signatures):
+                if self.mem_pool.exceeds_limits(tx):
+                    logger.info(f"接收交易：交易池内祖先或后代交易过多：{tx}")
+                    return False
                 logger.info(f"接收交易：验证交易成功：{tx}")
                 sign_utxo_from_tx(self.utxo_set, tx)
                 add_tx_to_mem_pool(self, tx)
+                self.limit_mem_pool()
+                if tx.id not in self.mem_pool:
+                    logger.info(f"接收交易：交易池已满且交易费率过低：{tx}")
+                    return False
+                self.miner.notify_pool_changed()
+                if self.allow_utxo_from_pool and self.orphan_pool:  # 交易的输出已可被使用
+                    verify_tx_in_orphan_pool(self, find_vout_pointer_from_txs([tx]))
                 return True
         logger.info(f"接收交易：验证交易失败或已在交易池中：{tx}")
         return False
 
+    @synchronized
+    def limit_mem_pool(self) -> List[Tx]:
+        """
+        移除交易池中超过存活时间的交易，并在总字节数超出上限时按费率淘汰交易，同时撤销其对UTXO集合的修改
+        :return: 被移除的交易
+        """
+        removed = self.mem_pool.expire() + self.mem_pool.trim()
+        for tx in removed:
+            release_utxos_of_evicted_tx(self, tx)
+        if removed:
+            logger.info(f"交易池：移除{len(removed)}条过期或费率过低的交易，剩余{self.mem_pool.total_size}字节")
+            self.miner.notify_pool_changed()
+        return removed
+
+    def receive_transactions(self, txs: List[Tx]) -> List[bool]:
+        """
+        批量接收交易，先并行验证全部签名，再依次放入交易池
+        :param txs: 交易列表
+        :return: 每条交易是否成功
+        """
+        candidates = [tx for tx in txs if verify_tx_basic(tx) and tx.id not in self.mem_pool]
+        jobs = [job for tx in candidates for job in build_signature_jobs(tx)]
+        bad_txs = {job[0] for job, ok in zip(jobs, verify_signatures_each(jobs)) if not ok}
+        results = []
+        for tx in txs:
+            if not verify_tx_basic(tx) or tx.id in bad_txs:
+                logger.info(f"接收交易：数字签名验证失败：{tx}")
+                results.append(False)
+            else:
+                results.append(self.receive_transaction(tx, check_signatures=False))
+        return results
+
     def broadcast_txs(self) -> bool:
         """广播所有离线交易"""
         # 无需广播
@@ -216,10 +340,12 @@ class Peer:
             line = f.readlines()[0]
             block_dic = json.loads(line)
             block = Block.from_dict(block_dic)
-            self.chain = [block]
+            self.chain.clear()
+            self.chain.append(block)
             utxos = find_utxos_from_block(block.txs)
             add_utxos_to_set(self.utxo_set, utxos)
 
+    @synchronized
     def create_candidate_block(self) -> bool:
         """
         构造候选区块
@@ -228,7 +354,12 @@ class Peer:
         if len(self.mem_pool) == 0:
             return False
         prev_hash = self.chain[-1].hash
-        txs = list(self.mem_pool.values())
+        # 预留区块头、交易数量前缀与coinbase交易的字节数，金额字段定长，不影响大小
+        reserved = len(Block(prev_hash=prev_hash, nonce=0, bits=Params.DIFFICULTY_BITS, txs=[]).header()) \
+            + 4 + Tx.create_coinbase(self.addr, 0).size
+        txs = self.mem_pool.select_txs(Params.MAX_BLOCK_SIZE - reserved)
+        if not txs:
+            return False
 
         value = Params.MINING_REWARDS + calculate_fees(txs)
         coinbase = Tx.create_coinbase(self.addr, value)
@@ -238,19 +369,20 @@ class Peer:
         logger.info(f"创建候选区块：{self.candidate_block}")
         return True
 
-    def consensus(self) -> bool:
+    def consensus(self, workers: Optional[int] = None) -> bool:
         """
         进行共识
+        :param workers: 挖矿进程数，默认使用节点配置
         :return: 修改nonce后的区块
         """
         if not self.candidate_block:
             if not self.create_candidate_block():
                 return False
         block = self.candidate_block
-        logger.info("共识：开始挖矿！")
-        nonce = mine(block)
-        logger.info(f"共识：挖矿结束，nonce={nonce}")
-        self.candidate_block = block.replace(nonce=nonce)
+        workers = workers or self.mining_workers
+        logger.info(f"共识：开始挖矿！进程数={workers}")
+        self.candidate_block = mine_block(block, workers, get_verify_pool() if workers > 1 else None)
+        logger.info(f"共识：挖矿结束，nonce={self.candidate_block.nonce}")
         return True
 
     def broadcast_block(self) -> bool:
@@ -267,90 +399,220 @@ class Peer:
         self.candidate_block = None
         return True
 
+    @synchronized
     def receive_block(self, block: Block) -> bool:
         """
-        接收区块并验证和加入链中
+        接收区块并验证和加入链中，随后连接等待该区块的孤儿区块
         :param block: 区块
-        :return: 是否成功
+        :return: 区块是否已在主链上
         """
-        if self.orphan_pool:
-            verify_tx_in_orphan_pool(self)
-
-        if not verify_block(self, block):
+        if not verify_block_basic(block):
+            return False
+        if self.chain.height_of(block.hash) != -1 or block.hash in self.side_blocks:  # 区块已存在
             return False
 
         prev_hash = block.prev_hash
-        height = locate_block_by_hash(self.chain, prev_hash)
-        if height == -1:  # 孤儿区块
+        if locate_block_by_hash(self.chain, prev_hash) == -1 and prev_hash not in self.side_blocks:  # 孤儿区块
             logger.debug("区块为孤儿区块")
-            self.orphan_block.append(block)
+            self.orphan_block.add(block)
             return False
+        if not self.connect_block(block):
+            return False
+        self.connect_orphan_blocks(block.hash)
+        return self.chain.height_of(block.hash) != -1
+
+    @synchronized
+    def connect_block(self, block: Block) -> bool:
+        """
+        验证区块并将其连接到链尾；父区块不在链尾时作为分支区块保存，分支更长时进行重组
+        :param block: 区块
+        :return: 是否被接受
+        """
+        height = locate_block_by_hash(self.chain, block.prev_hash)
         if height == len(self.chain):  # 父区块在链尾
+            if not self.verify_block_at(block, height):
+                return False
             logger.info("添加区块到区块链末尾成功")
             self.chain.append(block)
-            self.update_after_receive_block(block.txs)  # 更新UTXO_SET和交易池
+            self.update_after_receive_block(block)  # 更新UTXO_SET和交易池
             return True
-        elif height == len(self.chain) - 1:  # 父区块在链尾前一个
-            a = int(self.chain[-1].hash, 16)
-            b = int(block.hash, 16)
-            if a < b:  # 比较区块的哈希值
-                return False
-            else:
-                self.chain.pop()
-                self.chain.append(block)
-                self.roll_back()
-                self.update_after_receive_block(block.txs)
-                return True
-        else:
+
+        fork_height, branch = self.find_branch(block)
+        if fork_height == -1:
             return False
+        self.side_blocks.add(block)  # 分支区块只检查了PoW，重组时再完整验证
+        length = fork_height + 1 + len(branch)
+        if length > len(self.chain) or \
+                (length == len(self.chain) and int(block.hash, 16) < int(self.chain.tip_hash, 16)):
+            return self.reorganize(fork_height, branch)
+        return True
+
+    def verify_block_at(self, block: Block, height: int) -> bool:
+        """
+        验证即将连接到该高度的区块，假定有效的区块只检查工作量证明、前后连接与UTXO金额
+        :param block: 区块
+        :param height: 区块的高度
+        :return: 是否合法
+        """
+        if not verify_checkpoint(block, height):
+            logger.info(f"区块与高度{height}的检查点不符")
+            return False
+        check_signatures = block.hash not in self.assumed_valid
+        if not check_signatures:
+            self.assumed_valid.discard(block.hash)
+        return verify_block(self, block, check_signatures)
 
-    def update_after_receive_block(self, txs: List[Tx]) -> None:
+    def mark_assumed_valid(self, hashes: List[str]) -> None:
         """
-        在接收区块后更新UTXO_SET和交易池
-        :param txs: 交易
+        在首尾相连的区块哈希序列中找到最后一个假定有效的区块或检查点，将它及之前的区块标记为跳过签名验证
+        :param hashes: 按高度升序、前后相连的区块哈希
         """
-        utxo_set, pool = self.utxo_set, self.mem_pool
+        trusted = set(Params.CHECKPOINTS.values())
+        if Params.ASSUME_VALID:
+            trusted.add(Params.ASSUME_VALID)
+        last = max((i for i, block_hash in enumerate(hashes) if block_hash in trusted), default=-1)
+        if last != -1:
+            logger.info(f"假定有效：{last + 1}个区块将跳过签名验证")
+            self.assumed_valid.update(hashes[:last + 1])
+
+    def find_branch(self, block: Block) -> Tuple[int, List[Block]]:
+        """
+        沿分支区块向前查找与主链的分叉点
+        :param block: 分支末端的区块
+        :return: 分叉点高度与从分叉点之后到该区块的分支区块，找不到时高度为-1
+        """
+        branch = [block]
+        prev_hash = block.prev_hash
+        while self.chain.height_of(prev_hash) == -1:
+            parent = self.side_blocks.get(prev_hash)
+            if parent is None:
+                return -1, []
+            branch.append(parent)
+            prev_hash = parent.prev_hash
+        branch.reverse()
+        return self.chain.height_of(prev_hash), branch
+
+    @synchronized
+    def reorganize(self, fork_height: int, branch: List[Block]) -> bool:
+        """
+        断开分叉点之后的主链区块，再依次验证并连接新分支；新分支验证失败时恢复原主链，
+        验证失败的区块之前的分支区块仍保留在分支区块中，分支延长后可再次重组
+        :param fork_height: 分叉点高度
+        :param branch: 新分支区块
+        :return: 是否重组成功
+        """
+        if any(block_hash not in self.undo_records for block_hash in self.chain.hashes[fork_height + 1:]):
+            logger.info("区块重组失败：分叉过深，缺少撤销记录")
+            return False
+        disconnected = self.disconnect_blocks(fork_height)
+        for height, block in enumerate(branch, fork_height + 1):
+            if not self.verify_block_at(block, height):
+                logger.info("区块重组失败：新分支区块验证失败")
+                self.side_blocks.pop(block.hash, None)
+                self.disconnect_blocks(fork_height)
+                for old in disconnected:  # 原主链区块已验证过
+                    self.chain.append(old)
+                    self.update_after_receive_block(old)
+                return False
+            self.chain.append(block)
+            self.update_after_receive_block(block)
+        for block in branch:
+            self.side_blocks.pop(block.hash, None)
+        for old in disconnected:
+            self.side_blocks.add(old)
+        # 移除交易池中输入已被新分支花费的交易及其后代交易，并撤销其对UTXO集合的修改
+        for tx in list(self.mem_pool.values()):
+            if tx.id in self.mem_pool and any(vin.to_spend not in self.utxo_set for vin in tx.tx_in):
+                for removed in self.mem_pool.remove_with_descendants(tx.id):
+                    release_utxos_of_evicted_tx(self, removed)
+        self.limit_mem_pool()
+        logger.info(f"区块重组：断开{len(disconnected)}个区块，连接{len(branch)}个区块")
+        return True
+
+    def disconnect_blocks(self, fork_height: int) -> List[Block]:
+        """
+        按撤销记录依次断开链尾区块，直到链尾高度为fork_height
+        :param fork_height: 分叉点高度
+        :return: 被断开的区块，按高度升序排列
+        """
+        blocks = []
+        while len(self.chain) - 1 > fork_height:
+            block = self.chain.pop()
+            self.undo_block(self.undo_records.pop(block.hash))
+            blocks.append(block)
+        if blocks:
+            self.miner.notify_tip_changed()
+        blocks.reverse()
+        return blocks
+
+    def connect_orphan_blocks(self, block_hash: str) -> None:
+        """
+        按顺序连接等待该区块的孤儿区块及其后代
+        :param block_hash: 刚连接的区块哈希
+        """
+        queue = [block_hash]
+        while queue:
+            children = self.orphan_block.pop_children(queue.pop(0))
+            for child in children:
+                if self.connect_block(child):
+                    logger.info("连接孤儿区块成功")
+                    queue.append(child.hash)
+
+    def update_after_receive_block(self, block: Block) -> None:
+        """
+        在接收区块后更新UTXO_SET和交易池，并保存撤销记录
+        :param block: 区块
+        """
+        utxo_set, pool, txs = self.utxo_set, self.mem_pool, block.txs
         # 将交易使用过的UTXO从UTXO_SET移除
-        self.__utxos_from_vins = remove_spent_utxo_from_txs(utxo_set, txs)
-        # 将区块交易所有Vout封装成已确认的UTXO添加到UTXO_SET中，并备份
-        self.__pointers_from_vouts, self.__utxos_from_vouts = \
-            confirm_utxos_from_txs(utxo_set, txs, self.allow_utxo_from_pool)
-        # 将区块交易从交易池中移除，并备份
-        self.__txs_removed = remove_txs_from_pool(pool, txs)
-
-    def roll_back(self) -> None:
-        """
-        分叉后回滚
-        """
-        self.mem_pool.update(self.__txs_removed)
-        add_utxos_to_set(self.utxo_set, self.__utxos_from_vins)
-        remove_utxos_from_set(self.utxo_set, self.__pointers_from_vouts)
-        add_utxos_to_set(self.utxo_set, self.__utxos_from_vouts)
-        self.__utxos_from_vins.clear()
-        self.__utxos_from_vouts.clear()
-        self.__pointers_from_vouts.clear()
-        self.__txs_removed.clear()
+        spent_utxos = remove_spent_utxo_from_txs(utxo_set, txs)
+        # 将区块交易所有Vout封装成已确认的UTXO添加到UTXO_SET中
+        created_pointers, replaced_utxos = confirm_utxos_from_txs(utxo_set, txs, self.allow_utxo_from_pool)
+        # 将区块交易从交易池中移除
+        removed_txs = remove_txs_from_pool(pool, txs)
+        self.undo_records[block.hash] = UndoRecord(spent_utxos, created_pointers, replaced_utxos, removed_txs)
+        expired = len(self.chain) - 1 - Params.MAX_REORG_DEPTH
+        if expired >= 0:
+            self.undo_records.pop(self.chain.hashes[expired], None)
+        # 链尾已变化，正在挖的候选区块作废
+        self.miner.notify_tip_changed()
+        # 只重新验证等待区块新产生UTXO的孤儿交易
+        if self.orphan_pool:
+            verify_tx_in_orphan_pool(self, created_pointers)
+
+    def undo_block(self, record: UndoRecord) -> None:
+        """
+        按撤销记录恢复UTXO_SET和交易池
+        :param record: 撤销记录
+        """
+        self.mem_pool.update(record.removed_txs)
+        add_utxos_to_set(self.utxo_set, record.spent_utxos)
+        remove_utxos_from_set(self.utxo_set, record.created_pointers)
+        add_utxos_to_set(self.utxo_set, record.replaced_utxos)
 
     def save_data(self) -> None:
         """将节点状态保存到文件"""
         self.wallet.save_keys(self.wallet_file)
+        self.block_store.write_chain(self.chain)  # 只追加新区块
+        if self.need_snapshot():
+            self.save_snapshot()
         with open(self.blockchain_file, mode='w', encoding='utf-8') as f:
-            f.write(json.dumps(self.chain, cls=MyJSONEncoder))
+            f.write(json.dumps(len(self.chain)))
             f.write('\n')
             f.write(json.dumps(self.txs, cls=MyJSONEncoder))
             f.write('\n')
             pool_txs = list(self.mem_pool.values())
             f.write(json.dumps(pool_txs, cls=MyJSONEncoder))
             f.write('\n')
-            utxos = [utxo for utxo in self.utxo_set.values()]
-            f.write(json.dumps(utxos, cls=MyJSONEncoder))
+            f.write(json.dumps(None))  # UTXO集合保存在快照中
             f.write('\n')
             f.write(json.dumps(self.candidate_block, cls=MyJSONEncoder))
             f.write('\n')
             orphan_txs = list(self.orphan_pool.values())
             f.write(json.dumps(orphan_txs, cls=MyJSONEncoder))
             f.write('\n')
-            f.write(json.dumps(self.orphan_block, cls=MyJSONEncoder))
+            orphan_blocks = list(self.orphan_block.values())
+            f.write(json.dumps(orphan_blocks, cls=MyJSONEncoder))
             f.write('\n')
 
     def load_data(self) -> None:
@@ -359,21 +621,28 @@ class Peer:
         with open(self.blockchain_file, mode='r', encoding='utf-8') as f:
             lines = f.readlines()
             chain = json.loads(lines[0])
-            self.chain = [Block.from_dict(block) for block in chain]
             txs = json.loads(lines[1])
             self.txs = [Tx.from_dict(tx) for tx in txs]
-
-            pool_txs = json.loads(lines[2])
-            self.mem_pool.clear()
-            for tx_dic in pool_txs:
-                tx = Tx.from_dict(tx_dic)
-                self.mem_pool[tx.id] = tx
-
+            pool_txs = [Tx.from_dict(tx_dic) for tx_dic in json.loads(lines[2])]
             utxos = json.loads(lines[3])
-            self.utxo_set.clear()
-            for utxo_dic in utxos:
-                utxo = UTXO.from_dict(utxo_dic)
-                self.utxo_set[utxo.pointer] = utxo
+
+            if utxos is None:  # 从快照恢复链状态，再重放快照之后的区块
+                self.load_chain_state(chain)
+                for tx in pool_txs:  # 快照之后收到的交易
+                    if tx.id not in self.mem_pool:
+                        self.receive_transaction(tx)
+            else:  # 旧格式：UTXO集合与交易池以JSON保存
+                if isinstance(chain, list):  # 整条链以JSON保存
+                    self.chain = Chain(Block.from_dict(block) for block in chain)
+                else:  # 区块保存在区块存储中，按需读取
+                    self.chain = Chain.from_store(self.block_store, chain)
+                self.mem_pool.clear()
+                for tx in pool_txs:
+                    self.mem_pool[tx.id] = tx
+                self.utxo_set.clear()
+                for utxo_dic in utxos:
+                    utxo = UTXO.from_dict(utxo_dic)
+                    self.utxo_set[utxo.pointer] = utxo
 
             self.candidate_block = Block.from_dict(json.loads(lines[4]))
 
@@ -384,7 +653,57 @@ class Peer:
                 self.orphan_pool[tx.id] = tx
 
             orphan_blocks = json.loads(lines[6])
-            self.orphan_block = [Block.from_dict(block) for block in orphan_blocks]
+            self.orphan_block.clear()
+            for block_dic in orphan_blocks:
+                self.orphan_block.add(Block.from_dict(block_dic))
+
+    def need_snapshot(self) -> bool:
+        """
+        :return: 距上次快照已新增足够多的区块，或上次快照的区块已不在主链上
+        """
+        if self.snapshot_height < 0 or self.snapshot_height >= len(self.chain):
+            return True
+        if self.chain.hashes[self.snapshot_height] != self.snapshot_hash:
+            return True
+        return len(self.chain) - 1 - self.snapshot_height >= Params.SNAPSHOT_INTERVAL
+
+    def save_snapshot(self) -> None:
+        """将当前链尾的UTXO集合与交易池写入快照"""
+        snapshot = Snapshot(len(self.chain) - 1, self.chain.tip_hash,
+                            list(self.utxo_set.values()), list(self.mem_pool.values()))
+        snapshot.save(self.snapshot_file)
+        self.snapshot_height, self.snapshot_hash = snapshot.height, snapshot.tip_hash
+        logger.info(f"保存快照：高度={snapshot.height}，UTXO数={len(snapshot.utxos)}")
+
+    def load_chain_state(self, length: int) -> None:
+        """
+        加载快照中的UTXO集合与交易池，然后只重放快照之后的区块；快照不可用时从创世区块重放
+        :param length: 已保存的主链长度
+        """
+        stored = Chain.from_store(self.block_store, length)
+        snapshot = Snapshot.load(self.snapshot_file)
+        if snapshot is not None and \
+                (snapshot.height >= len(stored) or stored.hashes[snapshot.height] != snapshot.tip_hash):
+            logger.info("加载快照：快照不在已保存的主链上")
+            snapshot = None
+        self.utxo_set.clear()
+        self.mem_pool.clear()
+        if snapshot is not None:
+            self.chain = Chain.from_store(self.block_store, snapshot.height + 1)
+            for utxo in snapshot.utxos:
+                self.utxo_set[utxo.pointer] = utxo
+            for tx in snapshot.txs:
+                self.mem_pool[tx.id] = tx
+            self.snapshot_height, self.snapshot_hash = snapshot.height, snapshot.tip_hash
+        else:
+            self.chain = Chain.from_store(self.block_store, 1)
+            add_utxos_to_set(self.utxo_set, find_utxos_from_block(self.chain[0].txs))
+        logger.info(f"加载快照：需要重放{length - len(self.chain)}个区块")
+        self.mark_assumed_valid(stored.hashes[len(self.chain):])
+        for height in range(len(self.chain), length):
+            if not self.receive_block(stored[height]):
+                logger.info(f"加载快照：重放高度为{height}的区块失败")
+                break
 
     def update_chain(self):
         """从P2P网络中获取最长链更新本地区块链"""
@@ -396,20 +715,148 @@ class Peer:
             logger.info('当前无比自己更长的链')
             return False
         try:
-            url = f'http://{longest_node[0]}:{longest_node[1]}/chain'
-            response = httpx.get(url)
-            self.replace_chain(response.json())
-            return True
-        except:
-            logger.debug(f'访问{longest_node}区块链失败！')
+            return self.sync_chain(longest_node)
+        except Exception as e:
+            logger.debug(f'从{longest_node}同步区块链失败：{e}')
+            return False
+
+    def block_locator(self) -> List[str]:
+        """
+        :return: 区块定位器，从链尾开始的前10个区块逐个列出，之后步长加倍，最后为创世区块
+        """
+        if not self.chain:
+            return []
+        locator, height, step = [], len(self.chain) - 1, 1
+        while height > 0:
+            locator.append(self.chain.hashes[height])
+            if len(locator) >= 10:
+                step *= 2
+            height -= step
+        locator.append(self.chain.hashes[0])
+        return locator
+
+    def get_headers(self, locator: List[str], limit: int = Params.MAX_HEADERS_PER_REQUEST) -> List[dict]:
+        """
+        :param locator: 请求方的区块定位器
+        :param limit: 最多返回的区块头数量
+        :return: 定位器中第一个位于主链上的区块之后的区块头
+        """
+        start = 0
+        for block_hash in locator:
+            height = self.chain.height_of(block_hash)
+            if height != -1:
+                start = height + 1
+                break
+        end = min(len(self.chain), start + min(limit, Params.MAX_HEADERS_PER_REQUEST))
+        return [self.chain[height].header_dict() for height in range(start, end)]
+
+    def block_range(self, start: Optional[int] = None, end: Optional[int] = None,
+                    start_hash: Optional[str] = None, end_hash: Optional[str] = None) -> List[str]:
+        """
+        按高度或哈希确定主链上的区块区间，高度为负数时从链尾倒数
+        :param start: 起始高度
+        :param end: 结束高度（不含）
+        :param start_hash: 起始区块哈希，优先于start
+        :param end_hash: 结束区块哈希（含），优先于end
+        :return: 区间内的区块哈希列表，哈希不在主链上时为空
+        """
+        if start_hash is not None:
+            start = self.chain.height_of(start_hash)
+            if start == -1:
+                return []
+        if end_hash is not None:
+            end = self.chain.height_of(end_hash)
+            if end == -1:
+                return []
+            end += 1
+        return self.chain.hashes[start:end]
+
+    def block_json(self, block_hash: str) -> Optional[str]:
+        """
+        :param block_hash: 区块哈希
+        :return: 区块的JSON编码，已编码的区块直接从缓存返回
+        """
+        data = self.block_json_cache.get(block_hash)
+        if data is None:
+            height = self.chain.height_of(block_hash)
+            block = self.chain[height] if height != -1 else self.block_store.get(block_hash)
+            if block is None:
+                return None
+            data = json.dumps(block, cls=MyJSONEncoder)
+            self.block_json_cache.put(block_hash, data)
+        return data
+
+    def sync_headers(self, node: tuple) -> List[Block]:
+        """
+        从节点同步分叉点之后的区块头，并验证工作量证明与前后连接关系
+        :param node: 节点地址
+        :return: 区块头列表，第一个区块头的父区块在本地主链上；验证失败时返回空列表
+        """
+        headers = []
+        locator = self.block_locator()
+        while True:
+            batch = request_headers(node, locator)
+            for header in batch:
+                if header is None or not verify_block_basic(header):
+                    logger.info(f"同步区块头：{node}返回的区块头无效")
+                    return []
+                if not headers and self.chain.height_of(header.hash) != -1:  # 本地已有的区块
+                    continue
+                prev_hash = headers[-1].hash if headers else None
+                if (headers and header.prev_hash != prev_hash) or \
+                        (not headers and self.chain.height_of(header.prev_hash) == -1):
+                    logger.info(f"同步区块头：{node}返回的区块头不连续")
+                    return []
+                headers.append(header)
+            if len(batch) < Params.MAX_HEADERS_PER_REQUEST:
+                return headers
+            locator = [batch[-1].hash]
+
+    def download_blocks(self, nodes: List[tuple], start: int, headers: List[Block]) -> bool:
+        """
+        按区块头从多个节点并行下载区块，并按高度顺序连接
+        :param nodes: 节点地址列表
+        :param start: 第一个区块头的高度
+        :param headers: 已验证的区块头
+        :return: 是否全部下载并连接
+        """
+        return BlockDownloader(self, nodes, start, headers, fetch=request_blocks).run()
+
+    def sync_chain(self, node: tuple) -> bool:
+        """
+        先同步区块头并验证工作量证明，再只下载分叉点之后缺少的区块
+        :param node: 节点地址
+        :return: 主链是否已更新到该节点的链尾
+        """
+        headers = self.sync_headers(node)
+        if not headers:
+            logger.info('同步区块链：没有需要下载的区块')
+            return False
+        fork_height = self.chain.height_of(headers[0].prev_hash)
+        if fork_height + 1 + len(headers) <= len(self.chain):
+            logger.info('同步区块链：对方的链不比本地长')
             return False
+        logger.info(f'同步区块链：分叉点高度{fork_height}，需要下载{len(headers)}个区块')
+        self.mark_assumed_valid([header.hash for header in headers])
+        self.download_blocks([node] + self.peer_nodes, fork_height + 1, headers)
+        return self.chain.tip_hash == headers[-1].hash
 
+    @synchronized
     def replace_chain(self, chain_json):
         """替换本地区块链"""
         blocks = [Block.from_dict(block) for block in chain_json[1:]]
         self.chain.clear()
         self.utxo_set.clear()
+        # 撤销记录、分支区块与假定有效标记都属于原链，不能用于新链
+        self.undo_records.clear()
+        self.side_blocks.clear()
+        self.assumed_valid.clear()
         self.load_genesis_block(self.genesis_block_file)
+        linked = 0  # 与创世区块首尾相连的区块数
+        while linked < len(blocks) and \
+                blocks[linked].prev_hash == (blocks[linked - 1].hash if linked else self.chain.tip_hash):
+            linked += 1
+        self.mark_assumed_valid([block.hash for block in blocks[:linked]])
         for block in blocks:
             self.receive_block(block)
 
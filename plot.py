@@ -7,9 +7,10 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from blockchain.block import Block
+from blockchain.coin_selection import STRATEGIES
 from blockchain.consensus import mine
 from blockchain.params import Params
-from blockchain.transaction import Vin, Vout, Tx
+from blockchain.transaction import Vin, Vout, Tx, UTXO, Pointer
 # plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
 # plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
 from peer import Peer
@@ -144,4 +145,35 @@ def calc_create_and_verify_time():
     print(create_time / tx_cnt, tx_cnt / create_time, verify_time / tx_cnt, tx_cnt / verify_time)
 
 
+def calc_coin_selection_cost():
+    pA = Peer()
+    pA.generate_key()
+    random.seed(0)
+    for i in range(1000):  # 构造大量零散的UTXO
+        utxo = UTXO(Vout(pA.addr, random.randint(1, 100)), Pointer(sha256d(str(i)), 0),
+                    is_coinbase=False, unspent=True, confirmed=True)
+        pA.utxo_set[utxo.pointer] = utxo
+
+    tx_cnt = 50
+    values = [random.randint(100, 2000) for _ in range(tx_cnt)]
+    inputs, sign_time = np.zeros(len(STRATEGIES)), np.zeros(len(STRATEGIES))
+    for i, strategy in enumerate(STRATEGIES):
+        pA.coin_selection = strategy
+        for value in values:
+            begin = time.time()
+            pA.create_transaction('123456', value)
+            sign_time[i] += time.time() - begin
+            inputs[i] += len(pA.txs.pop().tx_in)
+        print(strategy, inputs[i] / tx_cnt, sign_time[i] / tx_cnt)
+
+    x_label = list(STRATEGIES)
+    plt.subplot(1, 2, 1)
+    plt.bar(x_label, inputs / tx_cnt)
+    plt.ylabel('Inputs per tx')
+    plt.subplot(1, 2, 2)
+    plt.bar(x_label, sign_time / tx_cnt)
+    plt.ylabel('Seconds per tx')
+    plt.show()
+
+
 draw_ecc()
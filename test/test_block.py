@@ -1,14 +1,15 @@
 import json
 import unittest
 
-from blockchain.block import Block
-from blockchain.consensus import mine, calculate_target
+from blockchain.block import Block, NONCE_FORMAT
+from blockchain.consensus import mine, mine_block, calculate_target, calculate_target_bytes
 from blockchain.params import Params
 from blockchain.transaction import Vin, Vout, Tx
 from blockchain.wallet import Wallet
 from utils.hash_utils import sha256d
 from utils.json_utils import MyJSONEncoder
 from utils.log import logger
+from utils.verify_utils import get_verify_pool
 
 
 class TestBlock(unittest.TestCase):
@@ -34,11 +35,30 @@ class TestBlock(unittest.TestCase):
         block = Block.from_dict(dic)
         self.assertEqual(self.block, block)
 
+    def test_header_immutable(self):
+        block_hash = self.block.hash
+        with self.assertRaises(AttributeError):
+            self.block.nonce = 1
+        self.assertEqual(self.block.hash, block_hash)
+        self.assertNotEqual(self.block.replace(nonce=1).hash, block_hash)
+
     def test_mine(self):
         nonce = mine(self.block)
         logger.debug(f"test_mine: nonce={nonce}")
         self.assertLessEqual(int(sha256d(self.block.header(nonce=nonce)), 16),
                              calculate_target(self.block.bits))
+        self.assertLess(bytes.fromhex(self.block.replace(nonce).hash),
+                        calculate_target_bytes(self.block.bits))
+
+    def test_mine_parallel(self):
+        block = mine_block(self.block, workers=2, pool=get_verify_pool())
+        self.assertEqual(block.timestamp, self.block.timestamp)
+        self.assertLess(int(block.hash, 16), calculate_target(block.bits))
+
+    def test_header_prefix(self):
+        header = self.block.header(nonce=7)
+        self.assertTrue(header.startswith(self.block.header_prefix()))
+        self.assertEqual(header[-NONCE_FORMAT.size:], NONCE_FORMAT.pack(7))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from blockchain.block import Block
+from blockchain.block_store import BlockStore
+from blockchain.chain import Chain
+from blockchain.transaction import Tx
+from peer import Peer
+from utils.network_utils import create_genesis_block, add_genesis_block
+
+
+class TestBlockStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'blocks')
+        self.store = BlockStore(self.directory, max_file_size=256)
+        self.chain = Chain()
+        prev_hash = None
+        for i in range(5):
+            block = Block(timestamp=12345 + i, prev_hash=prev_hash, txs=[Tx.create_coinbase('123456', i)])
+            self.chain.append(block)
+            prev_hash = block.hash
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_write_chain(self):
+        self.assertEqual(self.store.write_chain(self.chain), 5)
+        self.assertEqual(self.store.write_chain(self.chain), 0)
+        self.assertGreater(self.store.file_no, 0)
+        for height, block in enumerate(self.chain):
+            self.assertEqual(self.store.get_by_height(height), block)
+        self.assertIsNone(self.store.get('1234'))
+
+    def test_write_new_blocks_only(self):
+        self.store.write_chain(self.chain)
+        tip = self.chain.pop()
+        fork = Block(timestamp=1, prev_hash=self.chain.tip_hash, txs=[Tx.create_coinbase('654321', 1)])
+        self.chain.append(fork)
+        self.assertEqual(self.store.write_chain(self.chain), 1)
+        self.assertTrue(self.store.has(tip.hash))
+
+        store = BlockStore(self.directory)
+        self.assertEqual(len(store), 5)
+        chain = Chain.from_store(store)
+        self.assertTrue(all(block is None for block in chain.blocks))
+        self.assertEqual(chain.height_of(fork.hash), 4)
+        self.assertEqual(chain[-1], fork)
+        self.assertEqual(list(chain), list(self.chain))
+        store.close()
+
+    def test_peer_save_and_load(self):
+        files = {name: os.path.join(self.tmp.name, name + '_{0}')
+                 for name in ('wallet_file', 'blockchain_file', 'block_store_dir', 'snapshot_file')}
+        peer = Peer(**files)
+        peer.generate_key()
+        add_genesis_block(peer, create_genesis_block(peer.addr))
+        peer.save_data()
+        loaded = Peer(**files)
+        loaded.load_data()
+        self.assertEqual(loaded.chain.hashes, peer.chain.hashes)
+        self.assertEqual(loaded.chain[0], peer.chain[0])
+        self.assertEqual(loaded.get_balance(), peer.get_balance())
+        loaded.block_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from blockchain.wallet import Wallet
+from utils.cache_utils import LRUCache, KeyCache
+from utils.hash_utils import convert_pubkey_to_addr
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wallet = Wallet()
+        self.wallet.generate_key()
+        self.pk = self.wallet.pk.to_string()
+
+    def test_lru_cache(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_key_cache(self):
+        cache = KeyCache(10)
+        message = b'I love blockchain'
+        sig = self.wallet.sign(message)
+        for _ in range(3):
+            self.assertTrue(cache.verifying_key(self.pk).verify(sig, message))
+            self.assertEqual(cache.address(self.pk), convert_pubkey_to_addr(self.pk))
+        stats = cache.stats()
+        self.assertEqual(stats['keys']['hits'], 2)
+        self.assertEqual(stats['addrs']['misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from blockchain.block import Block
+from blockchain.chain import Chain
+from utils.verify_utils import locate_block_by_hash
+
+
+class TestChain(unittest.TestCase):
+    def setUp(self) -> None:
+        self.genesis = Block(timestamp=12345, prev_hash=None)
+        self.block = Block(timestamp=12346, prev_hash=self.genesis.hash)
+        self.chain = Chain([self.genesis, self.block])
+
+    def test_height_of(self):
+        self.assertEqual(self.chain.height_of(self.genesis.hash), 0)
+        self.assertEqual(self.chain.height_of(self.block.hash), 1)
+        self.assertEqual(self.chain.height_of('1234'), -1)
+        self.assertEqual(locate_block_by_hash(self.chain, self.block.hash), 2)
+        self.assertEqual(locate_block_by_hash(self.chain, '1234'), -1)
+
+    def test_pop_and_append(self):
+        self.assertEqual(self.chain.pop(), self.block)
+        self.assertEqual(self.chain.height_of(self.block.hash), -1)
+        fork = Block(timestamp=12347, prev_hash=self.genesis.hash)
+        self.chain.append(fork)
+        self.assertEqual(self.chain.height_of(fork.hash), 1)
+        self.assertEqual(self.chain[-1], fork)
+        self.assertEqual(len(self.chain), 2)
+
+    def test_clear(self):
+        self.chain.clear()
+        self.assertEqual(len(self.chain), 0)
+        self.assertEqual(self.chain.height_of(self.genesis.hash), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
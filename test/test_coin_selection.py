@@ -0,0 +1,44 @@
+import unittest
+
+from blockchain.coin_selection import select_coins, select_branch_and_bound, STRATEGIES
+from blockchain.transaction import Pointer, UTXO, Vout
+from blockchain.utxo_set import UTXOSet
+
+
+class TestCoinSelection(unittest.TestCase):
+    def setUp(self) -> None:
+        self.utxo_set = UTXOSet()
+        for i, value in enumerate([1, 2, 2, 5, 10, 20, 50]):
+            utxo = UTXO(Vout('123456', value), Pointer('1234', i), is_coinbase=False)
+            self.utxo_set[utxo.pointer] = utxo
+        self.utxos = self.utxo_set.sorted_utxos_of('123456')
+
+    def values(self, utxos):
+        return sorted(utxo.vout.value for utxo in utxos)
+
+    def test_sorted_utxos(self):
+        self.assertEqual([utxo.vout.value for utxo in self.utxos], [1, 2, 2, 5, 10, 20, 50])
+        del self.utxo_set[Pointer('1234', 3)]
+        self.assertEqual([utxo.vout.value for utxo in self.utxo_set.sorted_utxos_of('123456')],
+                         [1, 2, 2, 10, 20, 50])
+
+    def test_strategies(self):
+        self.assertEqual(self.values(select_coins(self.utxos, 4, 'smallest-first')), [1, 2, 2])
+        self.assertEqual(self.values(select_coins(self.utxos, 4, 'largest-first')), [50])
+        self.assertEqual(self.values(select_coins(self.utxos, 35, 'branch-and-bound')), [5, 10, 20])
+        self.assertEqual(self.values(select_coins(self.utxos, 70, 'branch-and-bound')), [20, 50])
+        self.assertEqual(sum(self.values(select_coins(self.utxos, 36, 'knapsack'))), 36)
+        self.assertEqual(self.values(select_coins(self.utxos, 45, 'knapsack')), [50])
+        for strategy in STRATEGIES:
+            self.assertIsNone(select_coins(self.utxos, 100, strategy))
+            self.assertGreaterEqual(sum(self.values(select_coins(self.utxos, 33, strategy))), 33)
+        self.assertRaises(ValueError, select_coins, self.utxos, 1, 'unknown')
+
+    def test_branch_and_bound(self):
+        self.assertEqual(self.values(select_branch_and_bound(self.utxos, 9)), [2, 2, 5])
+        self.assertEqual(self.values(select_branch_and_bound(self.utxos, 52)), [2, 50])
+        self.assertIsNone(select_branch_and_bound(self.utxos[4:], 45))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import time
+import unittest
+
+from p2p.downloader import BlockDownloader
+from peer import Peer
+from utils.network_utils import create_genesis_block, add_genesis_block
+
+
+class TestBlockDownloader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pA = Peer()
+        self.pA.generate_key()
+        self.pB = Peer()
+        self.pB.generate_key()
+        genesis_block = create_genesis_block(self.pA.addr)
+        add_genesis_block(self.pA, genesis_block)
+        add_genesis_block(self.pB, genesis_block)
+        for value in (100, 50, 20, 10):
+            self.pA.create_transaction(self.pB.addr, value)
+            self.pA.receive_transaction(self.pA.txs.pop())
+            self.pA.consensus()
+            self.pA.receive_block(self.pA.candidate_block)
+            self.pA.candidate_block = None
+        self.headers = self.pA.chain[1:]
+        self.requests = []
+
+    def fetch(self, node, start, end):
+        self.requests.append((node, start))
+        if node == 'bad':
+            raise ConnectionError('refused')
+        if node == 'slow':
+            time.sleep(0.5)
+        if node == 'forked':
+            return self.pA.chain[start + 1:end + 1]
+        return self.pA.chain[start:end]
+
+    def test_download(self):
+        downloader = BlockDownloader(self.pB, ['good', 'bad', 'slow', 'forked'], 1, self.headers,
+                                     batch=1, window=4, timeout=0.2, fetch=self.fetch)
+        self.assertTrue(downloader.run())
+        self.assertEqual(self.pB.chain.hashes, self.pA.chain.hashes)
+        self.assertEqual(downloader.nodes, ['good'])
+        self.assertEqual({node for node, _ in self.requests}, {'good', 'bad', 'slow', 'forked'})
+
+    def test_no_nodes(self):
+        downloader = BlockDownloader(self.pB, ['bad'], 1, self.headers, fetch=self.fetch)
+        self.assertFalse(downloader.run())
+        self.assertEqual(len(self.pB.chain), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from unittest import mock
+
+from blockchain.mem_pool import MemPool
+from blockchain.transaction import Pointer, Tx, Vin, Vout
+from utils.transaction_utils import remove_txs_from_pool
+from utils.verify_utils import verify_double_payment
+
+
+class TestMemPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = MemPool()
+        self.pointer = Pointer('1234', 0)
+        self.tx = Tx(tx_in=[Vin(self.pointer, b'sig', b'pk')], tx_out=[Vout('123456', 100)])
+        self.conflict = Tx(tx_in=[Vin(self.pointer, b'sig', b'pk')], tx_out=[Vout('654321', 100)])
+
+    def test_add(self):
+        self.pool.add(self.tx)
+        self.assertIn(self.tx.id, self.pool)
+        self.assertEqual(self.pool.spender_of(self.pointer), self.tx.id)
+        self.assertEqual(self.pool.conflicts(self.conflict), {self.tx.id})
+        self.assertTrue(verify_double_payment(self.conflict, self.pool))
+        self.assertTrue(verify_double_payment(self.tx, self.pool))
+
+    def test_remove(self):
+        self.pool.add(self.tx)
+        removed = remove_txs_from_pool(self.pool, [self.tx])
+        self.assertIsNone(self.pool.spender_of(self.pointer))
+        self.assertFalse(verify_double_payment(self.conflict, self.pool))
+        self.pool.update(removed)
+        self.assertEqual(self.pool.spender_of(self.pointer), self.tx.id)
+        self.pool.pop(self.tx.id)
+        self.assertEqual(len(self.pool.spent), 0)
+
+    def test_clear(self):
+        self.pool.add(self.tx)
+        self.pool.clear()
+        self.assertEqual(len(self.pool), 0)
+        self.assertEqual(len(self.pool.spent), 0)
+
+    def test_select_package(self):
+        parent = Tx(tx_in=[Vin(Pointer('aaaa', 0), b'sig', b'pk')], tx_out=[Vout('123456', 100)], fee=1)
+        child = Tx(tx_in=[Vin(Pointer(parent.id, 0), b'sig', b'pk')], tx_out=[Vout('123456', 90)], fee=1000)
+        middle = Tx(tx_in=[Vin(Pointer('bbbb', 0), b'sig', b'pk')], tx_out=[Vout('123456', 100)], fee=100)
+        self.pool.update({middle.id: middle, parent.id: parent, child.id: child})
+        self.assertEqual(self.pool.ancestors_of(child.id), {parent.id})
+        self.assertEqual(self.pool.ancestor_fee[child.id], 1001)
+        # 低费率父交易借助高费率子交易先于中等费率交易被选中
+        self.assertEqual(self.pool.select_txs(10 ** 6), [parent, child, middle])
+        self.assertEqual(self.pool.select_txs(parent.size + child.size), [parent, child])
+        self.assertEqual(self.pool.select_txs(middle.size), [middle])
+
+    def test_remove_parent(self):
+        parent = Tx(tx_in=[Vin(Pointer('aaaa', 0), b'sig', b'pk')], tx_out=[Vout('123456', 100)], fee=1)
+        child = Tx(tx_in=[Vin(Pointer(parent.id, 0), b'sig', b'pk')], tx_out=[Vout('123456', 90)], fee=1000)
+        self.pool.update({child.id: child, parent.id: parent})
+        self.assertEqual(self.pool.descendants_of(parent.id), {child.id})
+        self.assertEqual(self.pool.select_txs(10 ** 6), [parent, child])
+        del self.pool[parent.id]
+        self.assertEqual(self.pool.ancestors_of(child.id), set())
+        self.assertEqual(self.pool.ancestor_size[child.id], child.size)
+        self.assertEqual(self.pool.select_txs(10 ** 6), [child])
+
+    def test_trim(self):
+        parent = Tx(tx_in=[Vin(Pointer('aaaa', 0), b'sig', b'pk')], tx_out=[Vout('123456', 100)], fee=0)
+        child = Tx(tx_in=[Vin(Pointer(parent.id, 0), b'sig', b'pk')], tx_out=[Vout('123456', 90)], fee=1)
+        other = Tx(tx_in=[Vin(Pointer('bbbb', 0), b'sig', b'pk')], tx_out=[Vout('123456', 100)], fee=100)
+        self.pool.update({parent.id: parent, child.id: child, other.id: other})
+        self.assertEqual(self.pool.total_size, parent.size + child.size + other.size)
+        self.assertEqual(self.pool.trim(), [])
+        self.pool.max_bytes = self.pool.total_size - 1
+        # 淘汰费率最低的交易时一并淘汰其后代交易
+        self.assertEqual(self.pool.trim(), [child, parent])
+        self.assertListEqual(list(self.pool), [other.id])
+        self.assertEqual(self.pool.total_size, other.size)
+        self.assertEqual(len(self.pool.spent), 1)
+
+    def test_expire(self):
+        parent = Tx(tx_in=[Vin(Pointer('aaaa', 0), b'sig', b'pk')], tx_out=[Vout('123456', 100)], fee=1)
+        child = Tx(tx_in=[Vin(Pointer(parent.id, 0), b'sig', b'pk')], tx_out=[Vout('123456', 90)], fee=1)
+        with mock.patch('blockchain.mem_pool.time', side_effect=[1, 2, 3]):
+            self.pool.update({parent.id: parent, child.id: child})
+            self.pool.add(self.tx)
+        self.assertEqual(self.pool.expire(now=1 + self.pool.expiry + 0.5), [child, parent])
+        self.assertListEqual(list(self.pool), [self.tx.id])
+        self.assertEqual(self.pool.total_size, self.tx.size)
+
+    def test_package_limits(self):
+        pool = MemPool(max_ancestors=3, max_descendants=3)
+        pointer, txs = Pointer('aaaa', 0), []
+        for i in range(4):
+            tx = Tx(tx_in=[Vin(pointer, b'sig', b'pk')], tx_out=[Vout('123456', 100), Vout('654321', 1)], fee=i)
+            txs.append(tx)
+            pointer = Pointer(tx.id, 0)
+        for tx in txs[:3]:
+            self.assertFalse(pool.exceeds_limits(tx))
+            pool.add(tx)
+        self.assertTrue(pool.exceeds_limits(txs[3]))  # 祖先过多
+        self.assertEqual(pool.descendant_count[txs[0].id], 3)
+        sibling = Tx(tx_in=[Vin(Pointer(txs[0].id, 1), b'sig', b'pk')], tx_out=[Vout('123456', 1)])
+        self.assertTrue(pool.exceeds_limits(sibling))  # 第一条交易的后代过多
+        del pool[txs[1].id]
+        self.assertEqual(pool.descendant_count[txs[0].id], 1)
+        self.assertEqual(pool.ancestor_count[txs[2].id], 1)
+        self.assertEqual(pool.ancestor_fee[txs[2].id], txs[2].fee)
+        self.assertFalse(pool.exceeds_limits(sibling))
+
+    def test_expire_readded(self):
+        other = Tx(tx_in=[Vin(Pointer('aaaa', 0), b'sig', b'pk')], tx_out=[Vout('123456', 100)])
+        with mock.patch('blockchain.mem_pool.time', side_effect=[1, 2, 3]):
+            self.pool.add(self.tx)
+            self.pool.add(other)
+            self.pool.update(remove_txs_from_pool(self.pool, [self.tx]))  # 如区块被断开后交易重新进入交易池
+        self.assertListEqual(list(self.pool.added_at), [other.id, self.tx.id])
+        self.assertListEqual([tx_id for added_at, tx_id in self.pool.arrivals
+                              if self.pool.added_at.get(tx_id) == added_at], [other.id, self.tx.id])
+        self.assertEqual(self.pool.expire(now=2.5 + self.pool.expiry), [other])
+        self.assertListEqual(list(self.pool), [self.tx.id])
+        self.assertEqual(self.pool.expire(now=3 + self.pool.expiry), [])
+        self.assertEqual(self.pool.expire(now=3.5 + self.pool.expiry), [self.tx])
+        self.assertEqual(len(self.pool.arrivals), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,6 +24,24 @@ class TestMerkle(unittest.TestCase):
         abcd = sha256d(ab + computed_path[2][0])
         self.assertEqual(abcd, root)
 
+    def test_append(self):
+        leaves = [sha256d(str(i)) for i in range(13)]
+        merkle = MerkleTree()
+        for n, leaf in enumerate(leaves, 1):
+            merkle.append(leaf)
+            self.assertEqual(merkle.get_root(), MerkleTree(leaves[:n]).get_root())
+        self.assertEqual(merkle.levels, MerkleTree(leaves).levels)
+
+    def test_verify_path(self):
+        merkle = MerkleTree([sha256d(str(i)) for i in range(5)])
+        for index in range(len(merkle)):
+            self.assertTrue(verify_path(merkle.get_path(index)))
+        # 最后一个节点被提升两次，路径中只有一个兄弟节点
+        self.assertEqual(len(merkle.get_path(4)), 3)
+        path = merkle.get_path(2)
+        path[1] = (sha256d('x'), path[1][1])
+        self.assertFalse(verify_path(path))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+import threading
+import unittest
+
+from blockchain.consensus import calculate_target
+from peer import Peer
+from utils.network_utils import *
+
+
+class TestMiner(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pA = Peer()
+        self.pA.generate_key()
+        self.pB = Peer()
+        self.pB.generate_key()
+        genesis_block = create_genesis_block(self.pA.addr)
+        add_genesis_block(self.pA, genesis_block)
+        add_genesis_block(self.pB, genesis_block)
+        self.found = threading.Event()
+        self.pA.miner.on_found = lambda block: self.found.set()
+
+    def tearDown(self) -> None:
+        self.pA.miner.stop()
+
+    def test_wait_for_txs(self):
+        self.assertTrue(self.pA.miner.start())
+        self.assertFalse(self.pA.miner.start())
+        self.assertTrue(self.pA.miner.running)
+        self.assertIsNone(self.pA.candidate_block)
+        self.pA.miner.stop()
+        self.assertFalse(self.pA.miner.running)
+
+    def test_mine_after_pool_changed(self):
+        self.pA.miner.start()
+        self.pA.create_transaction(self.pB.addr, 100)
+        self.assertTrue(self.pA.receive_transaction(self.pA.txs[0]))
+        self.assertTrue(self.found.wait(timeout=60))
+        block = self.pA.candidate_block
+        self.assertEqual(block.prev_hash, self.pA.chain[-1].hash)
+        self.assertEqual(len(block.txs), 2)
+        self.assertLess(int(block.hash, 16), calculate_target(block.bits))
+        self.assertGreater(self.pA.miner.status()['hashes'], 0)
+
+    def test_mine_in_pool(self):
+        self.pA.create_transaction(self.pB.addr, 100)
+        self.assertTrue(self.pA.receive_transaction(self.pA.txs[0]))
+        self.pA.miner.start(workers=2)
+        self.assertTrue(self.found.wait(timeout=60))
+        block = self.pA.candidate_block
+        self.assertLess(int(block.hash, 16), calculate_target(block.bits))
+        self.assertGreater(self.pA.miner.status()['hashes'], 0)
+
+    def test_refresh_on_tip_changed(self):
+        self.pA.create_transaction(self.pB.addr, 100)
+        self.pA.receive_transaction(self.pA.txs[0])
+        self.pA.miner.refresh()
+        stale = self.pA.miner.block
+        self.pA.miner.notify_tip_changed()
+        self.assertTrue(self.pA.miner.stale_event.is_set())
+        self.pA.chain.append(stale.replace(nonce=1))
+        self.pA.miner.refresh()
+        self.assertEqual(self.pA.miner.block.prev_hash, self.pA.chain[-1].hash)
+        self.assertNotEqual(self.pA.miner.block.prev_hash, stale.prev_hash)
+
+    def test_survive_exception(self):
+        create_candidate_block = self.pA.create_candidate_block
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise KeyError('tx')
+            return create_candidate_block()
+
+        self.pA.create_candidate_block = flaky
+        self.pA.create_transaction(self.pB.addr, 100)
+        self.assertTrue(self.pA.receive_transaction(self.pA.txs[0]))
+        self.pA.miner.start()
+        self.assertTrue(self.found.wait(timeout=60))
+        self.assertGreaterEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from blockchain.orphan_pool import OrphanPool
+from blockchain.transaction import Pointer, Tx, Vin, Vout
+from peer import Peer
+from utils.network_utils import *
+
+
+class TestOrphanPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = OrphanPool(max_size=2, expiry=60)
+        self.pointer = Pointer('1234', 0)
+        self.txs = [Tx(tx_in=[Vin(Pointer('1234', i), b'sig', b'pk')], tx_out=[Vout('123456', 100)])
+                    for i in range(3)]
+
+    def test_waiting_on(self):
+        self.pool.add(self.txs[0], [self.pointer])
+        self.assertEqual(self.pool.waiting_on([self.pointer]), [self.txs[0].id])
+        self.assertEqual(self.pool.waiting_on([Pointer('1234', 1)]), [])
+        self.pool.pop(self.txs[0].id)
+        self.assertEqual(len(self.pool.waiting), 0)
+
+    def test_limit_and_expire(self):
+        for tx in self.txs:
+            self.pool.add(tx)
+        self.assertEqual(len(self.pool), 2)
+        self.assertNotIn(self.txs[0].id, self.pool)
+        self.assertEqual(self.pool.expire(), [])
+        expired = self.pool.expire(now=self.pool.added_at[self.txs[2].id] + 61)
+        self.assertEqual(set(expired), {self.txs[1].id, self.txs[2].id})
+        self.assertEqual(len(self.pool.waiting), 0)
+
+    def test_receive_parent(self):
+        pA, pB = Peer(), Peer()
+        pA.generate_key()
+        pB.generate_key()
+        genesis_block = create_genesis_block(pA.addr)
+        add_genesis_block(pA, genesis_block)
+        add_genesis_block(pB, genesis_block)
+        pA.allow_utxo_from_pool = pB.allow_utxo_from_pool = True
+        pA.create_transaction(pB.addr, 100)
+        parent = pA.txs[-1]
+        pA.receive_transaction(parent)
+        pA.create_transaction(pB.addr, 100)
+        child = pA.txs[-1]
+        self.assertFalse(pB.receive_transaction(child))
+        self.assertIn(child.id, pB.orphan_pool)
+        self.assertTrue(pB.receive_transaction(parent))
+        self.assertNotIn(child.id, pB.orphan_pool)
+        self.assertIn(child.id, pB.mem_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,16 @@
+import json
+import os
+import tempfile
 import unittest
+from unittest import mock
 
+from blockchain.consensus import mine_block
+from blockchain.transaction import Tx, Vin
 from peer import Peer
+from utils.cache_utils import signature_cache
 from utils.network_utils import *
+from utils.verify_utils import build_signature_jobs, verify_signatures, close_verify_pool, get_verify_pool, \
+    verify_block_basic
 
 
 class TestPeer(unittest.TestCase):
@@ -45,6 +54,255 @@ class TestPeer(unittest.TestCase):
         # self.assertEqual(len(self.pA.txs), 0)
         # self.assertTrue(tx.id in self.pA.mem_pool)
 
+    def test_receive_transactions(self):
+        self.pA.create_transaction(self.pB.addr, 100)
+        tx = self.pA.txs[0]
+        forged = Tx([Vin(vin.to_spend, vin.signature[::-1], vin.pubkey) for vin in tx.tx_in], tx.tx_out)
+        self.assertListEqual(self.pB.receive_transactions([forged, tx]), [False, True])
+        self.assertIn(tx.id, self.pB.mem_pool)
+        self.assertNotIn(forged.id, self.pB.mem_pool)
+
+    def test_verify_signatures_parallel(self):
+        self.pA.create_transaction(self.pB.addr, 100)
+        tx = self.pA.txs[0]
+        forged = Tx([Vin(vin.to_spend, vin.signature[::-1], vin.pubkey) for vin in tx.tx_in], tx.tx_out)
+        min_batch = Params.PARALLEL_VERIFY_MIN_BATCH
+        Params.PARALLEL_VERIFY_MIN_BATCH = 1
+        try:
+            self.assertTrue(verify_signatures(build_signature_jobs(tx) * 4))
+            pool = get_verify_pool()
+            self.assertFalse(verify_signatures(build_signature_jobs(tx) * 4 + build_signature_jobs(forged)))
+            self.assertIs(get_verify_pool(), pool)  # 错误签名不会终止共用的进程池
+        finally:
+            Params.PARALLEL_VERIFY_MIN_BATCH = min_batch
+            close_verify_pool()
+
+    def test_create_transactions(self):
+        self.assertFalse(self.pA.create_transactions([(self.pB.addr, 300), (self.pB.addr, 300)]))
+        self.assertTrue(self.pA.create_transactions([(self.pA.addr, 10)] * 4))
+        tx = self.pA.txs.pop()
+        self.assertEqual([vout.value for vout in tx.tx_out], [10] * 4 + [460])
+        self.pA.allow_utxo_from_pool = self.pB.allow_utxo_from_pool = True
+        self.assertTrue(self.pA.receive_transaction(tx))
+        self.assertTrue(self.pB.receive_transaction(tx))
+
+        payments = [(self.pB.addr, 5)] * 5
+        self.assertFalse(self.pA.create_transactions(payments + [(self.pB.addr, 500)], split=True))
+        self.assertEqual(len(self.pA.txs), 0)
+        min_batch = Params.PARALLEL_SIGN_MIN_BATCH
+        Params.PARALLEL_SIGN_MIN_BATCH = 1
+        try:
+            self.assertTrue(self.pA.create_transactions(payments, split=True))
+        finally:
+            Params.PARALLEL_SIGN_MIN_BATCH = min_batch
+            close_verify_pool()
+        txs = self.pA.txs
+        self.assertEqual(len(txs), 5)
+        self.assertEqual(len({vin.to_spend for tx in txs for vin in tx.tx_in}), 5)
+        self.assertListEqual(self.pB.receive_transactions(txs), [True] * 5)
+
+    def test_create_transactions_fee(self):
+        self.pA.fee = 2
+        self.assertFalse(self.pA.create_transactions([(self.pB.addr, 2)]))
+        self.assertTrue(self.pA.create_transaction(self.pB.addr, 30))
+        self.assertTrue(self.pA.create_transactions([(self.pB.addr, 30)]))
+        single, batch = self.pA.txs
+        self.assertEqual([vout.value for vout in batch.tx_out], [vout.value for vout in single.tx_out])
+        self.assertTrue(self.pA.create_transactions([(self.pB.addr, 10), (self.pB.addr, 20)]))
+        self.assertEqual([vout.value for vout in self.pA.txs[-1].tx_out][:2], [8, 20])
+        self.assertTrue(self.pA.create_transactions([(self.pB.addr, 30)], split=True))
+        self.assertEqual([vout.value for vout in self.pA.txs[-1].tx_out], [vout.value for vout in single.tx_out])
+
+    def test_limit_mem_pool(self):
+        self.pA.allow_utxo_from_pool = True
+        utxos = dict(self.pA.utxo_set)
+        self.assertTrue(self.pA.create_transaction(self.pB.addr, 100))
+        parent = self.pA.txs.pop()
+        self.assertTrue(self.pA.receive_transaction(parent))
+        self.assertTrue(self.pA.create_transaction(self.pB.addr, 50))
+        child = self.pA.txs.pop()
+        self.assertTrue(self.pA.receive_transaction(child))
+        self.assertEqual(self.pA.mem_pool.total_size, parent.size + child.size)
+        self.pA.mem_pool.max_bytes = parent.size - 1
+        self.assertListEqual(self.pA.limit_mem_pool(), [child, parent])
+        self.assertEqual(len(self.pA.mem_pool), 0)
+        self.assertDictEqual(dict(self.pA.utxo_set), utxos)
+        self.assertEqual(self.pA.get_balance(), Params.INITIAL_MONEY)
+        self.assertFalse(self.pA.receive_transaction(parent))
+
+    def test_signature_cache(self):
+        self.pA.create_transaction(self.pB.addr, 100)
+        tx = self.pA.txs[0]
+        signature_cache.clear()
+        self.assertTrue(self.pB.receive_transaction(tx))
+        self.assertEqual(signature_cache.stats()['hits'], 0)
+        self.assertTrue(verify_signatures(build_signature_jobs(tx)))
+        self.assertEqual(signature_cache.stats()['hits'], len(tx.tx_in))
+
+    def mine_block(self, peer, to_addr, value):
+        peer.create_transaction(to_addr, value)
+        peer.receive_transaction(peer.txs.pop())
+        peer.create_candidate_block()
+        peer.consensus()
+        block = peer.candidate_block
+        peer.candidate_block = None
+        self.assertTrue(peer.receive_block(block))
+        return block
+
+    def test_receive_orphan_blocks(self):
+        block1 = self.mine_block(self.pA, self.pB.addr, 100)
+        block2 = self.mine_block(self.pA, self.pB.addr, 50)
+        self.assertFalse(self.pB.receive_block(block2))
+        self.assertIn(block2.hash, self.pB.orphan_block)
+        self.assertTrue(self.pB.receive_block(block1))
+        self.assertEqual(len(self.pB.chain), 3)
+        self.assertEqual(self.pB.chain[-1], block2)
+        self.assertEqual(len(self.pB.orphan_block), 0)
+        self.assertEqual(self.pB.get_balance(), 150)
+
+    def test_sync_chain(self):
+        blocks = [self.mine_block(self.pA, self.pB.addr, value) for value in (100, 50, 20)]
+        self.assertTrue(self.pB.receive_block(blocks[0]))
+        requested = []
+
+        def request_headers(node, locator, limit=Params.MAX_HEADERS_PER_REQUEST):
+            return [Block.from_header_dict(dic) for dic in self.pA.get_headers(locator, limit)]
+
+        def request_blocks(node, start, end):
+            requested.extend(range(start, end))
+            return [Block.from_dict(json.loads(self.pA.block_json(block_hash)))
+                    for block_hash in self.pA.block_range(start, end)]
+
+        with mock.patch('peer.request_headers', request_headers), mock.patch('peer.request_blocks', request_blocks):
+            self.assertTrue(self.pB.sync_chain(('127.0.0.1', 5000)))
+            self.assertFalse(self.pB.sync_chain(('127.0.0.1', 5000)))
+        self.assertEqual(requested, [2, 3])
+        self.assertEqual(self.pB.chain.hashes, self.pA.chain.hashes)
+        self.assertEqual(self.pB.get_balance(), 170)
+
+    def test_reject_low_bits(self):
+        self.pA.create_transaction(self.pB.addr, 100)
+        coinbase = Tx.create_coinbase(self.pA.addr, Params.MINING_REWARDS)
+        block = mine_block(Block(prev_hash=self.pB.chain.tip_hash, bits=1, txs=[coinbase, self.pA.txs.pop()]))
+        self.assertFalse(verify_block_basic(block))
+        self.assertFalse(self.pB.receive_block(block))
+        self.assertNotIn(block.hash, self.pB.orphan_block)
+        self.assertNotIn(block.hash, self.pB.side_blocks)
+        with mock.patch('peer.request_headers', return_value=[block]):
+            self.assertEqual(self.pB.sync_headers(('127.0.0.1', 5000)), [])
+
+    def test_block_range(self):
+        blocks = [self.mine_block(self.pA, self.pB.addr, value) for value in (100, 50)]
+        hashes = self.pA.chain.hashes
+        self.assertEqual(self.pA.block_range(), hashes)
+        self.assertEqual(self.pA.block_range(start=-1), [blocks[-1].hash])
+        self.assertEqual(self.pA.block_range(start_hash=blocks[0].hash, end_hash=blocks[0].hash), [blocks[0].hash])
+        self.assertEqual(self.pA.block_range(start_hash='1234'), [])
+        data = self.pA.block_json(blocks[0].hash)
+        self.assertEqual(Block.from_dict(json.loads(data)), blocks[0])
+        self.assertIs(self.pA.block_json(blocks[0].hash), data)
+
+    def test_assume_valid(self):
+        self.pA.create_transaction(self.pB.addr, 100)
+        tx = self.pA.txs.pop()
+        forged = Tx([Vin(vin.to_spend, vin.signature[::-1], vin.pubkey) for vin in tx.tx_in], tx.tx_out)
+        coinbase = Tx.create_coinbase(self.pA.addr, Params.MINING_REWARDS)
+        block = mine_block(Block(prev_hash=self.pA.chain.tip_hash, txs=[coinbase, forged]))
+        self.assertFalse(self.pB.receive_block(block))
+        assume_valid = Params.ASSUME_VALID
+        Params.ASSUME_VALID = block.hash
+        try:
+            self.pB.mark_assumed_valid([block.hash])
+            self.assertTrue(self.pB.receive_block(block))
+        finally:
+            Params.ASSUME_VALID = assume_valid
+        self.assertEqual(len(self.pB.assumed_valid), 0)
+
+    def test_reorganize(self):
+        pC = Peer()
+        pC.wallet = self.pA.wallet
+        add_genesis_block(pC, self.pA.chain[0])
+        a_blocks = [self.mine_block(self.pA, self.pB.addr, value) for value in (100, 50)]
+        c_blocks = [self.mine_block(pC, self.pB.addr, value) for value in (200, 20, 10)]
+        for block in c_blocks[:2]:
+            self.pA.receive_block(block)
+        self.assertTrue(self.pA.receive_block(c_blocks[2]))
+        self.assertEqual(self.pA.chain.hashes, pC.chain.hashes)
+        self.assertEqual(self.pA.utxo_set, pC.utxo_set)
+        self.assertEqual(len(self.pA.mem_pool), 0)  # 原分支交易与新分支冲突
+        self.assertTrue(all(block.hash in self.pA.side_blocks for block in a_blocks))
+        self.assertEqual(set(self.pA.undo_records), set(pC.chain.hashes[1:]))
+
+        for block in a_blocks:  # 较短的分支不会引起重组
+            self.assertFalse(pC.receive_block(block))
+        self.assertEqual(pC.chain[-1], c_blocks[-1])
+
+    def test_reorganize_after_failure(self):
+        pC = Peer()
+        pC.wallet = self.pA.wallet
+        add_genesis_block(pC, self.pA.chain[0])
+        c_blocks = [self.mine_block(pC, self.pB.addr, value) for value in (200, 20)]
+        self.assertTrue(pC.create_transaction(self.pB.addr, 10))
+        bad_block = mine_block(Block(prev_hash=pC.chain.tip_hash,
+                                     txs=[Tx.create_coinbase(self.pA.addr, Params.MINING_REWARDS + 1), pC.txs.pop()]))
+        c_blocks.append(self.mine_block(pC, self.pB.addr, 10))
+        a_hashes = [self.mine_block(self.pA, self.pB.addr, value).hash for value in (100, 50)]
+        a_hashes.insert(0, self.pA.chain[0].hash)
+        for block in c_blocks[:2]:  # 等长分支按哈希值决定是否重组，直接作为分支区块保存
+            self.pA.side_blocks.add(block)
+
+        self.assertFalse(self.pA.receive_block(bad_block))  # 奖励过多，重组失败
+        self.assertEqual(self.pA.chain.hashes, a_hashes)
+        self.assertNotIn(bad_block.hash, self.pA.side_blocks)
+        self.assertTrue(all(block.hash in self.pA.side_blocks for block in c_blocks[:2]))
+
+        self.assertTrue(self.pA.receive_block(c_blocks[2]))  # 分支延长后重组成功
+        self.assertEqual(self.pA.chain.hashes, pC.chain.hashes)
+        self.assertEqual(self.pA.utxo_set, pC.utxo_set)
+
+    def test_reorganize_releases_pool_inputs(self):
+        pC = Peer()
+        pC.wallet = self.pA.wallet
+        add_genesis_block(pC, self.pA.chain[0])
+        self.assertTrue(pC.receive_block(self.mine_block(self.pA, self.pB.addr, 200)))
+        self.mine_block(self.pA, self.pB.addr, 500)
+        # 交易池中的交易花费找零的300和原分支上新挖出的500
+        self.pA.allow_utxo_from_pool = pC.allow_utxo_from_pool = True
+        self.assertTrue(self.pA.create_transaction(self.pB.addr, 800))
+        self.assertTrue(self.pA.receive_transaction(self.pA.txs.pop()))
+        for _ in range(2):  # 新分支不花费找零的300
+            self.assertTrue(pC.create_transaction(self.pB.addr, 500))
+            tx = pC.txs.pop()
+            block = mine_block(Block(prev_hash=pC.chain.tip_hash,
+                                     txs=[Tx.create_coinbase(self.pA.addr, Params.MINING_REWARDS), tx]))
+            self.assertTrue(pC.receive_block(block))
+            self.pA.receive_block(block)
+        self.assertEqual(self.pA.chain.hashes, pC.chain.hashes)
+        self.assertEqual(len(self.pA.mem_pool), 0)
+        self.assertEqual(self.pA.utxo_set, pC.utxo_set)
+        self.assertEqual(self.pA.get_balance(), 800)
+
+    def test_replace_chain(self):
+        pC = Peer()
+        pC.wallet = self.pA.wallet
+        add_genesis_block(pC, self.pA.chain[0])
+        c_blocks = [self.mine_block(pC, self.pB.addr, value) for value in (200, 20, 10)]
+        for value in (100, 50):
+            self.mine_block(self.pA, self.pB.addr, value)
+        self.assertFalse(self.pA.receive_block(c_blocks[0]))  # 较短的分支
+        self.assertIn(c_blocks[0].hash, self.pA.side_blocks)
+        self.pA.assumed_valid.add('1234')
+        with tempfile.TemporaryDirectory() as tmp:
+            self.pA.genesis_block_file = os.path.join(tmp, 'genesis_block.txt')
+            with open(self.pA.genesis_block_file, mode='w') as f:
+                f.write(self.pA.block_json(self.pA.chain[0].hash))
+            self.pA.replace_chain([json.loads(pC.block_json(block_hash)) for block_hash in pC.chain.hashes])
+        self.assertEqual(self.pA.chain.hashes, pC.chain.hashes)
+        self.assertEqual(self.pA.utxo_set, pC.utxo_set)
+        self.assertEqual(set(self.pA.undo_records), set(pC.chain.hashes[1:]))
+        self.assertEqual(len(self.pA.side_blocks), 0)
+        self.assertNotIn('1234', self.pA.assumed_valid)
+
 
 if __name__ == '__main__':
     unittest.main()
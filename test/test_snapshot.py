@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from blockchain.snapshot import Snapshot
+from blockchain.transaction import Pointer, Tx, UTXO, Vout
+from peer import Peer
+from utils.network_utils import create_genesis_block, add_genesis_block
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = {name: os.path.join(self.tmp.name, name + '_{0}')
+                      for name in ('wallet_file', 'blockchain_file', 'block_store_dir', 'snapshot_file')}
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_serialize(self):
+        utxo = UTXO(Vout('123456', 50), Pointer('abcd', 1), is_coinbase=True, unspent=False, confirmed=True)
+        tx = Tx.create_coinbase('123456', 50)
+        snapshot = Snapshot(3, tx.id, [utxo], [tx])
+        data = snapshot.serialize()
+        loaded = Snapshot.deserialize(data)
+        self.assertEqual(loaded.height, 3)
+        self.assertEqual(loaded.tip_hash, tx.id)
+        self.assertEqual(loaded.utxos, [utxo])
+        self.assertEqual(loaded.txs, [tx])
+        corrupted = data[:-40] + bytes([data[-40] ^ 1]) + data[-39:]
+        self.assertIsNone(Snapshot.deserialize(corrupted))
+
+    def test_replay_after_snapshot(self):
+        peer = Peer(**self.files)
+        peer.generate_key()
+        add_genesis_block(peer, create_genesis_block(peer.addr))
+        peer.save_data()
+        self.assertEqual(peer.snapshot_height, 0)
+
+        peer.create_transaction('123456', 100)
+        peer.receive_transaction(peer.txs.pop())
+        peer.consensus()
+        self.assertTrue(peer.receive_block(peer.candidate_block))
+        peer.candidate_block = None
+        peer.create_transaction('123456', 50)
+        peer.receive_transaction(peer.txs.pop())
+        peer.save_data()
+        self.assertEqual(peer.snapshot_height, 0)  # 未达到快照间隔
+
+        loaded = Peer(**self.files)
+        loaded.load_data()
+        self.assertEqual(loaded.snapshot_height, 0)
+        self.assertEqual(loaded.chain.hashes, peer.chain.hashes)
+        self.assertEqual(loaded.utxo_set, peer.utxo_set)
+        self.assertEqual(set(loaded.mem_pool), set(peer.mem_pool))
+        self.assertEqual(loaded.get_balance(), peer.get_balance())
+        loaded.block_store.close()
+        peer.block_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
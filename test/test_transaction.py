@@ -2,6 +2,7 @@ import json
 import unittest
 
 from blockchain.transaction import *
+from utils.hash_utils import sha256d
 from utils.json_utils import MyJSONEncoder
 
 
@@ -22,6 +23,22 @@ class TestTransaction(unittest.TestCase):
         self.assertEqual(Tx(), Tx())
         self.assertNotEqual(self.tx, Tx.create_coinbase(self.addr, self.value))
 
+    def test_tx_id(self):
+        tx = Tx(tx_in=[Vin(self.pointer, b'sig', b'pk')], tx_out=[Vout(self.addr, self.value)])
+        same = Tx(tx_in=[Vin(Pointer(self.tx.id, 0), b'sig', b'pk')], tx_out=[Vout(self.addr, self.value)])
+        self.assertEqual(tx.id, same.id)
+        self.assertEqual(tx.id, sha256d(tx.serialize()))
+        self.assertNotEqual(tx.id, Tx(tx_in=tx.tx_in, tx_out=tx.tx_out, fee=1).id)
+        self.assertNotEqual(Tx([], []).id, Tx().id)
+
+    def test_tx_frozen(self):
+        with self.assertRaises(AttributeError):
+            self.tx.fee = 1
+        with self.assertRaises(AttributeError):
+            self.pointer.n = 1
+        with self.assertRaises(AttributeError):
+            self.tx.tx_out[0].value = 1
+
     def test_tx_coinbase(self):
         self.assertTrue(self.tx.is_coinbase)
         self.assertFalse(Tx([], []).is_coinbase)
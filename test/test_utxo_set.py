@@ -0,0 +1,42 @@
+import unittest
+
+from blockchain.transaction import Tx, Vin, Vout
+from blockchain.utxo_set import UTXOSet
+from utils.transaction_utils import add_utxos_from_block_to_set, remove_spent_utxo_from_txs, \
+    sign_utxo_from_tx, add_utxos_to_set
+
+
+class TestUTXOSet(unittest.TestCase):
+    def setUp(self) -> None:
+        self.utxo_set = UTXOSet()
+        self.coinbase = Tx.create_coinbase('123456', 100)
+        self.tx = Tx(tx_in=[Vin(None, b'sig', b'pk')], tx_out=[Vout('123456', 20), Vout('654321', 30)])
+        add_utxos_from_block_to_set(self.utxo_set, [self.coinbase, self.tx])
+
+    def test_balance(self):
+        self.assertEqual(self.utxo_set.balance_of('123456'), 120)
+        self.assertEqual(self.utxo_set.balance_of('654321'), 30)
+        self.assertEqual(self.utxo_set.balance_of('000000'), 0)
+        self.assertEqual(len(self.utxo_set.utxos_of('123456')), 2)
+
+    def test_sign_and_remove(self):
+        pointer = [p for p, u in self.utxo_set.items() if u.vout.value == 100][0]
+        spend = Tx(tx_in=[Vin(pointer, b'sig', b'pk')], tx_out=[Vout('654321', 100)])
+        sign_utxo_from_tx(self.utxo_set, spend)
+        self.assertEqual(self.utxo_set.balance_of('123456'), 20)
+        self.assertEqual(len(self.utxo_set.utxos_of('123456')), 1)
+        self.assertEqual(len(self.utxo_set.utxos_of('123456', unspent_only=False)), 2)
+
+        removed = remove_spent_utxo_from_txs(self.utxo_set, [spend])
+        self.assertEqual(self.utxo_set.balance_of('123456'), 20)
+        add_utxos_to_set(self.utxo_set, [utxo.replace(unspent=True, confirmed=True) for utxo in removed])
+        self.assertEqual(self.utxo_set.balance_of('123456'), 120)
+
+    def test_clear(self):
+        self.utxo_set.clear()
+        self.assertEqual(self.utxo_set.by_addr, {})
+        self.assertEqual(self.utxo_set.balances, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
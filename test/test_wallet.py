@@ -2,6 +2,8 @@ import unittest
 
 import ecdsa
 
+from blockchain.sighash import SigHash
+from blockchain.transaction import Pointer, Vout
 from blockchain.wallet import Wallet
 
 
@@ -26,6 +28,16 @@ class TestWallet(unittest.TestCase):
         with self.assertRaises(ecdsa.BadSignatureError):
             pk.verify(sig, b'123')
 
+    def test_sighash(self):
+        pk = self.wallet.pk.to_string()
+        tx_out = [Vout(self.wallet.addr, 100), Vout('123456', 50)]
+        sighash = SigHash(tx_out)
+        pointers = [Pointer('1234', 0), Pointer('1234', 1)]
+        messages = [sighash.message(pk, pointer) for pointer in pointers]
+        self.assertNotEqual(messages[0], messages[1])
+        self.assertEqual(messages[0], Wallet.create_signature_message(pk, pointers[0], tx_out))
+        self.assertNotEqual(messages[0], SigHash(tx_out[:1]).message(pk, pointers[0]))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+
+import ecdsa
+from ecdsa.ellipticcurve import PointJacobi
+
+from blockchain.params import Params
+from utils.hash_utils import convert_pubkey_to_addr
+
+
+class LRUCache:
+    """
+    容量有限的LRU缓存，线程安全，并统计命中率
+    """
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: 最大条目数
+        """
+        self.capacity = capacity
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        """
+        :param key: 键
+        :param default: 未命中时的返回值
+        :return: 缓存的值
+        """
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value) -> None:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+        :param key: 键
+        :param value: 值
+        """
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.capacity:
+                self.data.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存与统计"""
+        with self.lock:
+            self.data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        :return: 缓存统计信息
+        """
+        total = self.hits + self.misses
+        return {'size': len(self.data),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
+
+
+class SignatureCache(LRUCache):
+    """
+    验证成功的签名缓存，交易签名以(交易编号, 输入序号, 公钥, 签名明文)为键，
+    脚本中的签名以(签名, 公钥, 签名明文)为键
+    """
+
+    def contains(self, key) -> bool:
+        """
+        :param key: 签名的键
+        :return: 该签名是否已验证成功
+        """
+        return self.get(key, False)
+
+    def add(self, key) -> None:
+        """
+        :param key: 验证成功的签名的键
+        """
+        self.put(key, True)
+
+
+def precompute_verifying_key(pk_str: bytes) -> ecdsa.VerifyingKey:
+    """
+    :param pk_str: 公钥字符串
+    :return: 带有乘法预计算表的公钥对象
+    """
+    # VerifyingKey.from_string构造的点不带阶，无法直接调用precompute()，这里显式指定阶
+    point = PointJacobi.from_bytes(Params.CURVE.curve, pk_str, order=Params.CURVE.order, generator=True)
+    vk = ecdsa.VerifyingKey.from_public_point(point, curve=Params.CURVE)
+    vk.pubkey.point * 2  # 立即生成预计算表
+    return vk
+
+
+class KeyCache:
+    """
+    公钥缓存，保存解析后的VerifyingKey（重复出现的公钥启用预计算表）以及公钥对应的地址
+    """
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: 每类缓存的最大条目数
+        """
+        self.keys = LRUCache(capacity)
+        self.addrs = LRUCache(capacity)
+
+    def verifying_key(self, pk_str: bytes) -> ecdsa.VerifyingKey:
+        """
+        首次出现的公钥直接解析；再次出现时才构造预计算表，避免为只出现一次的公钥付出预计算开销
+        :param pk_str: 公钥字符串
+        :return: 公钥对象
+        """
+        entry = self.keys.get(pk_str)
+        if entry is None:
+            vk = ecdsa.VerifyingKey.from_string(pk_str, curve=Params.CURVE)
+            self.keys.put(pk_str, (vk, False))
+            return vk
+        vk, precomputed = entry
+        if not precomputed:
+            vk = precompute_verifying_key(pk_str)
+            self.keys.put(pk_str, (vk, True))
+        return vk
+
+    def address(self, pk_str: bytes) -> str:
+        """
+        :param pk_str: 公钥字符串
+        :return: 公钥对应的地址
+        """
+        addr = self.addrs.get(pk_str)
+        if addr is None:
+            addr = convert_pubkey_to_addr(pk_str)
+            self.addrs.put(pk_str, addr)
+        return addr
+
+    def clear(self) -> None:
+        """清空缓存与统计"""
+        self.keys.clear()
+        self.addrs.clear()
+
+    def stats(self) -> dict:
+        """
+        :return: 缓存统计信息
+        """
+        return {'keys': self.keys.stats(), 'addrs': self.addrs.stats()}
+
+
+signature_cache = SignatureCache(Params.SIGNATURE_CACHE_SIZE)
+key_cache = KeyCache(Params.KEY_CACHE_SIZE)
@@ -25,7 +25,7 @@ def convert_pubkey_to_addr(pubkey: bytes) -> str:
     return b58encode_check(b'\x00' + ripe).decode()
 
 
-def build_message(string: str) -> bytes:
+def build_message(string: Union[str, bytes]) -> bytes:
     """
     计算明文的双哈希值
     :param string: 明文
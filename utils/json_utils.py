@@ -2,6 +2,7 @@ import ecdsa
 from flask.json import JSONEncoder
 
 from blockchain.block import Block
+from blockchain.chain import Chain
 from blockchain.transaction import Tx
 from utils.printable import Printable
 
@@ -14,8 +15,10 @@ class MyJSONEncoder(JSONEncoder):
             return obj.to_string().hex()
         if isinstance(obj, ecdsa.VerifyingKey):
             return obj.to_string().hex()
+        if isinstance(obj, Chain):
+            return list(obj)
         if isinstance(obj, Printable):
-            obj_dict = obj.__dict__.copy()
+            obj_dict = {k: v for k, v in obj.__dict__.items() if not k.startswith('_')}
             if isinstance(obj, Tx):
                 obj_dict['is_coinbase'] = obj.is_coinbase
                 obj_dict['id'] = obj.id
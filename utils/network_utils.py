@@ -1,3 +1,7 @@
+from typing import List
+
+import httpx
+
 from blockchain.block import Block
 from blockchain.consensus import mine
 from blockchain.params import Params
@@ -29,3 +33,32 @@ def add_genesis_block(peer, genesis_block: Block):
     peer.chain.append(genesis_block)
     utxos = find_utxos_from_block(genesis_block.txs)
     add_utxos_to_set(peer.utxo_set, utxos)
+
+
+def request_headers(node: tuple, locator: List[str], limit: int = Params.MAX_HEADERS_PER_REQUEST) -> List[Block]:
+    """
+    向节点请求区块定位器之后的主链区块头
+    :param node: 节点地址
+    :param locator: 区块定位器
+    :param limit: 最多返回的区块头数量
+    :return: 只有区块头的区块列表，哈希不符的区块头为None
+    """
+    url = f'http://{node[0]}:{node[1]}/headers'
+    response = httpx.get(url, params={'locator': ','.join(locator), 'limit': limit},
+                         timeout=Params.REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return [Block.from_header_dict(dic) for dic in response.json()]
+
+
+def request_blocks(node: tuple, start: int, end: int) -> List[Block]:
+    """
+    向节点请求高度在[start, end)内的主链区块
+    :param node: 节点地址
+    :param start: 起始高度
+    :param end: 结束高度（不含）
+    :return: 区块列表
+    """
+    url = f'http://{node[0]}:{node[1]}/blocks'
+    response = httpx.get(url, params={'start': start, 'end': end}, timeout=Params.REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return [Block.from_dict(dic) for dic in response.json()]
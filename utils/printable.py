@@ -1,4 +1,17 @@
 class Printable:
 
     def __repr__(self):
-        return str(self.__dict__)
+        return str({k: v for k, v in self.__dict__.items() if not k.startswith('_')})
+
+
+class Frozen(Printable):
+    """构造完成后属性不可修改的对象"""
+
+    def freeze(self):
+        """冻结对象，之后修改属性将抛出AttributeError"""
+        self.__dict__['_frozen'] = True
+
+    def __setattr__(self, key, value):
+        if self.__dict__.get('_frozen', False):
+            raise AttributeError(f"{self.__class__.__name__}对象不可修改")
+        super().__setattr__(key, value)
@@ -0,0 +1,110 @@
+import struct
+from typing import Optional, Union
+
+UINT32 = struct.Struct('<I')
+INT64 = struct.Struct('<q')
+NONE_LENGTH = 0xFFFFFFFF  # 长度字段取该值时表示None
+
+
+def pack_uint(n: int) -> bytes:
+    """
+    :param n: 无符号整数
+    :return: 4字节小端表示
+    """
+    return UINT32.pack(n)
+
+
+def pack_int(n: int) -> bytes:
+    """
+    :param n: 有符号整数
+    :return: 8字节小端表示
+    """
+    return INT64.pack(n)
+
+
+def pack_bytes(data: Optional[bytes]) -> bytes:
+    """
+    :param data: 字节串
+    :return: 带长度前缀的字节串，None单独编码
+    """
+    if data is None:
+        return UINT32.pack(NONE_LENGTH)
+    return UINT32.pack(len(data)) + data
+
+
+def pack_str(string: Optional[Union[str, int]]) -> bytes:
+    """
+    :param string: 字符串
+    :return: 带长度前缀的UTF-8编码
+    """
+    if string is None:
+        return pack_bytes(None)
+    return pack_bytes(str(string).encode())
+
+
+def pack_list(items) -> bytes:
+    """
+    :param items: 可序列化对象的列表
+    :return: 带数量前缀的序列化结果
+    """
+    if items is None:
+        return UINT32.pack(NONE_LENGTH)
+    return UINT32.pack(len(items)) + b''.join(item.serialize() for item in items)
+
+
+class Reader:
+    """
+    按pack_*函数的编码顺序读取字节串
+    """
+
+    def __init__(self, data, offset: int = 0):
+        """
+        :param data: 字节串，可以是bytes、memoryview或mmap
+        :param offset: 起始偏移
+        """
+        self.data = data
+        self.offset = offset
+
+    def read(self, n: int) -> bytes:
+        """
+        :param n: 字节数
+        :return: 读取的字节串
+        """
+        if self.offset + n > len(self.data):
+            raise ValueError("数据长度不足")
+        data = bytes(self.data[self.offset:self.offset + n])
+        self.offset += n
+        return data
+
+    def unpack(self, fmt: struct.Struct) -> tuple:
+        """
+        :param fmt: 结构体格式
+        :return: 解包结果
+        """
+        return fmt.unpack(self.read(fmt.size))
+
+    def uint(self) -> int:
+        return self.unpack(UINT32)[0]
+
+    def int(self) -> int:
+        return self.unpack(INT64)[0]
+
+    def bytes(self) -> Optional[bytes]:
+        length = self.uint()
+        if length == NONE_LENGTH:
+            return None
+        return self.read(length)
+
+    def str(self) -> Optional[str]:
+        data = self.bytes()
+        return data.decode() if data is not None else None
+
+    def list(self, cls) -> Optional[list]:
+        """
+        :param cls: 元素类型，需提供deserialize(reader)类方法
+        :return: 对象列表
+        """
+        count = self.uint()
+        if count == NONE_LENGTH:
+            return None
+        return [cls.deserialize(self) for _ in range(count)]
@@ -170,10 +170,34 @@ def sign_utxo_from_tx(utxo_set, tx):
     for vin in tx.tx_in:
         pointer = vin.to_spend
         utxo = utxo_set[pointer]
-        utxo = utxo.replace(unspent=False)
+        utxo = utxo.replace(unspent=False, confirmed=utxo.confirmed)
         utxo_set[pointer] = utxo
 
 
+def unsign_utxo_from_tx(utxo_set, tx):
+    """
+    撤销sign_utxo_from_tx，将tx花费的UTXO重新标记为未花费
+    :param utxo_set: UTXO集合
+    :param tx: 交易
+    """
+    for vin in tx.tx_in:
+        pointer = vin.to_spend
+        utxo = utxo_set.get(pointer)
+        if utxo is not None:  # 父交易可能已先被移除
+            utxo_set[pointer] = utxo.replace(unspent=True, confirmed=utxo.confirmed)
+
+
+def release_utxos_of_evicted_tx(peer, tx):
+    """
+    撤销add_tx_to_mem_pool与sign_utxo_from_tx对UTXO集合的修改，交易本身应已从交易池移除
+    :param peer: 节点
+    :param tx: 交易
+    """
+    if peer.allow_utxo_from_pool:
+        remove_utxos_from_set(peer.utxo_set, find_vout_pointer_from_txs([tx]))
+    unsign_utxo_from_tx(peer.utxo_set, tx)
+
+
 def calculate_fees(txs) -> int:
     """
     计算交易列表的交易费总和
@@ -1,13 +1,16 @@
+import multiprocessing
+
 import ecdsa
 
 from blockchain.block import Block
 from blockchain.consensus import calculate_target
+from blockchain.mem_pool import MemPool
 from blockchain.params import Params
 from blockchain.transaction import Tx
-from blockchain.wallet import Wallet
-from utils.hash_utils import convert_pubkey_to_addr
+from blockchain.sighash import SigHash
+from utils.cache_utils import signature_cache, key_cache
 from utils.log import logger
-from utils.transaction_utils import add_tx_to_mem_pool, calculate_fees
+from utils.transaction_utils import calculate_fees
 
 
 def verify_tx_basic(tx):
@@ -31,76 +34,205 @@ def verify_double_payment(tx, pool):
     """
     if tx.id in pool:
         return True
+    if isinstance(pool, MemPool):
+        return pool.conflicts(tx)
     a = {vin.to_spend for vin in tx.tx_in}
     b = {vin.to_spend for tx in pool.values() for vin in tx.tx_in}
     return a.intersection(b)
 
 
-def verify_signature_for_vin(vin, utxo, tx_out):
+def verify_signature(pk_str, sig, message) -> bool:
     """
-    验证交易创建者是否拥有输入单元所使用的UTXO所有权
-    :param vin: 输入单元
-    :param utxo: UTXO对象
-    :param tx_out: 输出列表
+    验证数字签名
+    :param pk_str: 公钥字符串
+    :param sig: 签名
+    :param message: 签名明文
     :return: 签名是否匹配
     """
-    pk_str, sig = vin.pubkey, vin.signature
-    to_addr = utxo.vout.to_addr
-    pk_as_addr = convert_pubkey_to_addr(pk_str)
-    if pk_as_addr != to_addr:  # 地址是否匹配
-        logger.debug("签名地址不匹配")
+    vk = key_cache.verifying_key(pk_str)
+    try:
+        return vk.verify(sig, message)
+    except ecdsa.BadSignatureError:
         return False
+
+
+def verify_signature_job(job) -> bool:
+    """
+    验证一条签名任务，供工作进程调用
+    :param job: (交易编号, 输入序号, 公钥, 签名, 明文)
+    :return: 签名是否匹配
+    """
+    _, _, pk_str, sig, message = job
+    return verify_signature(pk_str, sig, message)
+
+
+def verify_signature_job_in_worker(job) -> bool:
+    """
+    在工作进程中验证一条签名任务，直接解析公钥，不经过带锁的公钥缓存
+    :param job: (交易编号, 输入序号, 公钥, 签名, 明文)
+    :return: 签名是否匹配
+    """
+    _, _, pk_str, sig, message = job
     vk = ecdsa.VerifyingKey.from_string(pk_str, curve=Params.CURVE)
-    message = Wallet.create_signature_message(pk_str, vin.to_spend, tx_out)
     try:
-        vk.verify(sig, message)  # 数字签名是否匹配
-        return True
+        return vk.verify(sig, message)
     except ecdsa.BadSignatureError:
-        logger.debug("数字签名验证失败")
         return False
 
 
-def verify_tx(peer, tx, mem_pool):
+_verify_pool = None
+
+
+def get_verify_pool():
     """
-    验证交易是否合法
+    签名验证、批量签名与并行挖矿共用的进程池。工作进程由fork创建，应在启动任何线程之前调用一次，
+    之后不再关闭，避免在多线程进程中fork
+    :return: 签名验证进程池
+    """
+    global _verify_pool
+    if _verify_pool is None:
+        _verify_pool = multiprocessing.Pool(Params.VERIFY_WORKERS)
+    return _verify_pool
+
+
+def close_verify_pool():
+    """终止签名验证进程池，其他线程未完成的任务也被丢弃，只应在退出时调用"""
+    global _verify_pool
+    if _verify_pool is not None:
+        _verify_pool.terminate()
+        _verify_pool.join()
+        _verify_pool = None
+
+
+def signature_job_key(job) -> tuple:
+    """
+    :param job: 签名任务
+    :return: 签名缓存中的键：(交易编号, 输入序号, 公钥, 签名明文)
+    """
+    tx_id, index, pk_str, _, message = job
+    return tx_id, index, pk_str, message
+
+
+def verify_signatures(jobs) -> bool:
+    """
+    验证一批签名，跳过已缓存的签名；数量达到阈值时在进程池中并行验证，遇到第一个错误签名立即返回，
+    剩余任务的结果被丢弃，进程池保持运行
+    :param jobs: 签名任务列表
+    :return: 是否全部匹配
+    """
+    jobs = [job for job in jobs if not signature_cache.contains(signature_job_key(job))]
+    if len(jobs) < Params.PARALLEL_VERIFY_MIN_BATCH:
+        for job in jobs:
+            if not verify_signature_job(job):
+                logger.debug("数字签名验证失败")
+                return False
+            signature_cache.add(signature_job_key(job))
+        return True
+    chunksize = max(1, len(jobs) // (4 * (Params.VERIFY_WORKERS or multiprocessing.cpu_count())))
+    for ok in get_verify_pool().imap_unordered(verify_signature_job_in_worker, jobs, chunksize):
+        if not ok:
+            logger.debug("数字签名验证失败")
+            return False
+    for job in jobs:
+        signature_cache.add(signature_job_key(job))
+    return True
+
+
+def verify_signatures_each(jobs):
+    """
+    分别验证一批签名，跳过已缓存的签名；数量达到阈值时在进程池中并行验证
+    :param jobs: 签名任务列表
+    :return: 每条签名是否匹配
+    """
+    keys = [signature_job_key(job) for job in jobs]
+    results = [signature_cache.contains(key) for key in keys]
+    pending = [i for i, ok in enumerate(results) if not ok]
+    if len(pending) < Params.PARALLEL_VERIFY_MIN_BATCH:
+        checked = [verify_signature_job(jobs[i]) for i in pending]
+    else:
+        checked = get_verify_pool().map(verify_signature_job_in_worker, [jobs[i] for i in pending])
+    for i, ok in zip(pending, checked):
+        results[i] = ok
+        if ok:
+            signature_cache.add(keys[i])
+    return results
+
+
+def build_signature_jobs(tx):
+    """
+    构造交易所有输入单元的签名任务，不检查UTXO
+    :param tx: 交易
+    :return: 签名任务列表
+    """
+    sighash = SigHash(tx.tx_out)
+    return [(tx.id, i, vin.pubkey, vin.signature, sighash.message(vin.pubkey, vin.to_spend))
+            for i, vin in enumerate(tx.tx_in)]
+
+
+def collect_signature_jobs(peer, tx, mem_pool):
+    """
+    验证交易中除数字签名外的条件，并收集待验证的签名
     :param peer: 节点对象
     :param tx: 交易
     :param mem_pool: 交易池
-    :return: 是否合法
+    :return: 签名任务列表，交易不合法时返回None
     """
     if not verify_tx_basic(tx):
         logger.debug("参数格式验证失败")
-        return False
+        return None
     if verify_double_payment(tx, mem_pool):
         logger.debug("存在双重支付")
-        return False
+        return None
+    missing = [vin.to_spend for vin in tx.tx_in if vin.to_spend not in peer.utxo_set]
+    if missing:  # UTXO不存在就加入到孤儿交易池中
+        peer.orphan_pool.add(tx, missing)
+        logger.debug("交易使用的UTXO不存在，交易将被加入到孤立交易池中")
+        return None
     available_value = 0
-    for vin in tx.tx_in:
-        utxo = peer.utxo_set.get(vin.to_spend, None)
-        if not utxo:  # UTXO不存在就加入到孤儿交易池中
-            peer.orphan_pool[tx.id] = tx
-            logger.debug("交易使用的UTXO不存在，交易将被加入到孤立交易池中")
-            return False
-        if not verify_signature_for_vin(vin, utxo, tx.tx_out):
-            return False
+    sighash = SigHash(tx.tx_out)
+    jobs = []
+    for i, vin in enumerate(tx.tx_in):
+        utxo = peer.utxo_set[vin.to_spend]
+        if key_cache.address(vin.pubkey) != utxo.vout.to_addr:  # 地址是否匹配
+            logger.debug("签名地址不匹配")
+            return None
+        message = sighash.message(vin.pubkey, vin.to_spend)
+        jobs.append((tx.id, i, vin.pubkey, vin.signature, message))
         available_value += utxo.vout.value
     if available_value < sum(vout.value for vout in tx.tx_out):
         logger.debug("输入金额小于输出金额")
+        return None
+    return jobs
+
+
+def verify_tx(peer, tx, mem_pool, check_signatures=True):
+    """
+    验证交易是否合法
+    :param peer: 节点对象
+    :param tx: 交易
+    :param mem_pool: 交易池
+    :param check_signatures: 是否验证数字签名
+    :return: 是否合法
+    """
+    jobs = collect_signature_jobs(peer, tx, mem_pool)
+    if jobs is None:
+        return False
+    if check_signatures and not verify_signatures(jobs):
         return False
     return True
 
 
-def verify_tx_in_orphan_pool(peer):
+def verify_tx_in_orphan_pool(peer, pointers):
     """
-    验证peer中的孤儿交易池中是否有交易通过验证
+    重新验证孤儿交易池中等待这些UTXO的交易，通过验证的交易放入交易池
     :param peer: 结点
+    :param pointers: 新产生的UTXO定位指针
     """
-    copy_pool = peer.orphan_pool.copy()
-    for tx in copy_pool.values():
-        if not verify_tx(peer, tx, peer.mem_pool):
-            continue
-        add_tx_to_mem_pool(peer, tx)
-        del peer.orphan_pool[tx.id]
+    peer.orphan_pool.expire()
+    for tx_id in peer.orphan_pool.waiting_on(pointers):
+        tx = peer.orphan_pool.pop(tx_id, None)
+        if tx is not None:  # 可能已在递归处理中被接收
+            peer.receive_transaction(tx)
 
 
 def verify_coinbase(tx, reward):
@@ -127,6 +259,9 @@ def verify_block_basic(block):
     """
     if not isinstance(block, Block):
         return False
+    # 难度由本节点规定，不能使用对方给出的难度，否则可以用极低的难度伪造任意长的区块头链
+    if block.bits != Params.DIFFICULTY_BITS:
+        return False
     # 检查PoW是否正确
     if int(block.hash, 16) > calculate_target(block.bits):
         return False
@@ -165,11 +300,12 @@ def verify_block_txs(block, reward):
     return True
 
 
-def verify_block(peer, block):
+def verify_block(peer, block, check_signatures=True):
     """
     验证区块是否合法
     :param peer: 节点对象
     :param block: 区块
+    :param check_signatures: 是否验证数字签名，为False时仍检查地址与金额
     :return: 是否合法
     """
     # if block == peer.candidate_block:
@@ -185,10 +321,22 @@ def verify_block(peer, block):
     if verify_double_payment_in_block(block_txs):
         logger.debug("区块交易存在双重支付")
         return False
+    jobs = []
     for tx in block_txs:
-        if not verify_tx(peer, tx, {}):
+        tx_jobs = collect_signature_jobs(peer, tx, {})
+        if tx_jobs is None:
             return False
-    return True
+        jobs.extend(tx_jobs)
+    return verify_signatures(jobs) if check_signatures else True
+
+
+def verify_checkpoint(block, height):
+    """
+    :param block: 区块
+    :param height: 区块的高度
+    :return: 该高度没有检查点，或区块与检查点一致
+    """
+    return Params.CHECKPOINTS.get(height, block.hash) == block.hash
 
 
 def locate_block_by_hash(chain, prev_hash):
@@ -198,7 +346,5 @@ def locate_block_by_hash(chain, prev_hash):
     :param prev_hash: 前一区块的哈希
     :return: 区块的高度
     """
-    for height, block in enumerate(chain):
-        if block.hash == prev_hash:
-            return height + 1
-    return -1
+    height = chain.height_of(prev_hash)
+    return height + 1 if height != -1 else -1
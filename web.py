@@ -1,13 +1,17 @@
 import json
+import zlib
 from argparse import ArgumentParser
 
-from flask import Flask, send_from_directory, jsonify, request
+from flask import Flask, Response, send_from_directory, jsonify, request, stream_with_context
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 
+from blockchain.params import Params
 from peer import Peer, Block, Tx
+from utils.cache_utils import signature_cache, key_cache
 from utils.json_utils import MyJSONEncoder
 from utils.log import logger
+from utils.verify_utils import get_verify_pool
 
 app = Flask(__name__)
 CORS(app)
@@ -25,6 +29,7 @@ parser.add_argument('-p', '--port', type=int, default=5000)
 args = parser.parse_args()
 port = args.port
 
+get_verify_pool()  # 在启动P2P与挖矿线程之前fork进程池
 peer = Peer(port=port, ws_notify=notify)
 peer.init()
 peer.p2p_run()
@@ -84,7 +89,89 @@ def generate_keys():
 
 @app.route('/chain', methods=['GET'])
 def get_chain():
-    return jsonify(peer.chain)
+    return stream_blocks(peer.block_range(), ndjson=False)
+
+
+def json_array_chunks(hashes):
+    """
+    :param hashes: 区块哈希列表
+    :return: 逐个区块生成JSON数组片段
+    """
+    yield '['
+    separator = ''
+    for data in filter(None, map(peer.block_json, hashes)):  # 跳过期间被移出主链且未存储的区块
+        yield separator + data
+        separator = ','
+    yield ']'
+
+
+def ndjson_chunks(hashes):
+    """
+    :param hashes: 区块哈希列表
+    :return: 逐个区块生成NDJSON行
+    """
+    for data in filter(None, map(peer.block_json, hashes)):
+        yield data + '\n'
+
+
+def gzip_chunks(chunks):
+    """
+    :param chunks: 文本片段
+    :return: 逐段压缩的gzip数据，每段后同步刷新以便接收方边收边解
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def stream_blocks(hashes, ndjson: bool):
+    """
+    以生成器逐个输出区块，客户端接受gzip时压缩
+    :param hashes: 区块哈希列表
+    :param ndjson: 是否以NDJSON格式输出，否则输出JSON数组
+    """
+    chunks = ndjson_chunks(hashes) if ndjson else json_array_chunks(hashes)
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(stream_with_context(gzip_chunks(chunks)), mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@app.route('/headers', methods=['GET'])
+def get_headers():
+    locator = request.args.get(key='locator', type=str, default='')
+    limit = request.args.get(key='limit', type=int, default=Params.MAX_HEADERS_PER_REQUEST)
+    response = peer.get_headers([block_hash for block_hash in locator.split(',') if block_hash], limit)
+    return jsonify(response)
+
+
+@app.route('/blocks', methods=['GET'])
+def get_blocks():
+    """
+    按高度（start、end，负数表示从链尾倒数）或哈希（start_hash、end_hash）获取主链区块；
+    after为上一页最后一个区块的哈希，用于分页；format=ndjson时逐行输出且默认不限制数量
+    """
+    hashes = peer.block_range(request.args.get(key='start', type=int, default=None),
+                              request.args.get(key='end', type=int, default=None),
+                              request.args.get(key='start_hash', type=str, default=None),
+                              request.args.get(key='end_hash', type=str, default=None))
+    after = request.args.get(key='after', type=str, default=None)
+    if after is not None:
+        hashes = hashes[hashes.index(after) + 1:] if after in hashes else []
+    ndjson = request.args.get(key='format', type=str, default='json') == 'ndjson'
+    limit = request.args.get(key='limit', type=int, default=None)
+    if not ndjson:
+        limit = min(limit or Params.MAX_BLOCKS_PER_REQUEST, Params.MAX_BLOCKS_PER_REQUEST)
+    page = hashes[:limit] if limit is not None else hashes
+    response = stream_blocks(page, ndjson)
+    if page and len(page) < len(hashes):  # 还有下一页
+        response.headers['X-Next-After'] = page[-1]
+    return response
 
 
 @app.route('/mem-pool', methods=['GET'])
@@ -99,6 +186,12 @@ def get_utxo_set():
     return jsonify(response)
 
 
+@app.route('/utxo-set/<addr>', methods=['GET'])
+def get_utxos_of_addr(addr):
+    response = {'addr': addr, 'balance': peer.get_balance(addr), 'utxos': peer.get_utxos(addr)}
+    return jsonify(response)
+
+
 @app.route('/txs', methods=['GET'])
 def get_txs():
     return jsonify(peer.txs)
@@ -112,7 +205,14 @@ def get_orphan_pool():
 
 @app.route('/orphan-block', methods=['GET'])
 def get_orphan_block():
-    return jsonify(peer.orphan_block)
+    response = [block for block in peer.orphan_block.values()]
+    return jsonify(response)
+
+
+@app.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    response = {'signatures': signature_cache.stats(), 'keys': key_cache.stats()}
+    return jsonify(response)
 
 
 @app.route('/peers', methods=['GET'])
@@ -147,16 +247,34 @@ def create_transaction():
         return jsonify(response)
 
 
+@app.route('/transactions', methods=['POST'])
+def create_transactions():
+    if peer.wallet.empty():
+        response = {'message': '钱包未初始化！'}
+        return jsonify(response)
+    payments_str = request.form.get(key='payments', type=str, default=None)
+    split = request.form.get(key='split', type=str, default='false').lower() in ('1', 'true')
+    try:
+        payments = [(str(addr), int(value)) for addr, value in json.loads(payments_str)]
+    except (TypeError, ValueError):
+        response = {'message': '参数错误！'}
+        return jsonify(response)
+    if peer.create_transactions(payments, split):
+        response = peer.txs
+        return jsonify(response)
+    else:
+        response = {'message': '创建交易失败！'}
+        return jsonify(response)
+
+
 @app.route('/receive-txs', methods=['POST'])
 def receive_transaction():
     txs_str = request.form.get('txs', type=str)
     if txs_str is None:
         response = {'message': '参数错误！'}
         return jsonify(response)
-    txs = json.loads(txs_str)
-    for tx in txs:
-        tx = Tx.from_dict(tx)
-        res = peer.receive_transaction(tx)
+    txs = [Tx.from_dict(tx) for tx in json.loads(txs_str)]
+    for tx, res in zip(txs, peer.receive_transactions(txs)):
         if not res:
             logger.debug("交易验证失败或已在交易池中！：" + str(tx))
     response = {'message': '已广播！'}
@@ -185,10 +303,42 @@ def create_candidate_block():
     return jsonify(peer.candidate_block)
 
 
+def notify_mined(block: Block):
+    socketio.emit('mine', json.dumps(block, cls=MyJSONEncoder))
+
+
+peer.miner.on_found = notify_mined
+
+
 @socketio.on('mine')
 def mine(message):
-    if peer.consensus():
-        emit('mine', json.dumps(peer.candidate_block, cls=MyJSONEncoder))
+    workers = message.get('workers') if isinstance(message, dict) else None
+    if not peer.miner.start(workers):
+        emit('notify', 'already mining')
+
+
+@socketio.on('stop-mine')
+def stop_mine(message):
+    peer.miner.stop()
+    emit('notify', 'mining stopped')
+
+
+@app.route('/miner', methods=['GET'])
+def get_miner():
+    return jsonify(peer.miner.status())
+
+
+@app.route('/miner', methods=['POST'])
+def start_miner():
+    workers = request.form.get(key='workers', type=int, default=None)
+    peer.miner.start(workers)
+    return jsonify(peer.miner.status())
+
+
+@app.route('/miner', methods=['DELETE'])
+def stop_miner():
+    peer.miner.stop()
+    return jsonify(peer.miner.status())
 
 
 @app.route('/receive-block', methods=['POST'])